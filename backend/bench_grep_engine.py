@@ -0,0 +1,95 @@
+"""Benchmark the mmap/process-pool grep engine against a line-by-line Python scan
+
+Usage: python bench_grep_engine.py --size-mb 2048 --processes 1 4 8
+The corpus is generated once under --corpus (kept between runs) so repeated
+runs measure the search rather than file creation.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from grep_engine import GrepEngine, grep_file
+from parallel_walker import ParallelWalker
+
+WORDS = ("alpha beta gamma delta report budget invoice summary draft notes final backup "
+         "archive meeting project thesis vacation resume data value error warning info").split()
+NEEDLE = "needle_in_the_haystack"
+FILE_MB = 16
+
+
+def make_corpus(root, size_mb, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    files = max(1, size_mb // FILE_MB)
+    line_block = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(4096)]
+    for i in range(files):
+        path = os.path.join(root, f"dir_{i % 32}", f"log_{i}.txt")
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            written = 0
+            while written < FILE_MB * 1024 * 1024:
+                lines = rng.sample(line_block, 512)
+                if rng.random() < 0.05:
+                    lines[rng.randrange(len(lines))] += f" {NEEDLE}"
+                text = "\n".join(lines) + "\n"
+                f.write(text)
+                written += len(text)
+
+
+def naive_scan(root, needle):
+    """Read every file line by line in this process, as a plain Python loop would"""
+    matches = 0
+    for current, dirs, files in os.walk(root):
+        for name in files:
+            with open(os.path.join(current, name), "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if needle in line.lower():
+                        matches += 1
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4, os.cpu_count() or 4])
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "filewise_grep_corpus"))
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Preparing ~{args.size_mb} MB corpus under {args.corpus} ...")
+    make_corpus(args.corpus, args.size_mb)
+    walker = ParallelWalker()
+
+    if not args.skip_naive:
+        started = time.perf_counter()
+        expected = naive_scan(args.corpus, NEEDLE)
+        baseline = time.perf_counter() - started
+        print(f"{'naive line loop':<22}{expected:>9} matches {baseline:>8.2f}s")
+    else:
+        expected, baseline = None, None
+
+    started = time.perf_counter()
+    single = sum(len(grep_file(os.path.join(c, n), NEEDLE)) for c, _, fs in os.walk(args.corpus) for n in fs)
+    seconds = time.perf_counter() - started
+    print(f"{'mmap, in-process':<22}{single:>9} matches {seconds:>8.2f}s"
+          + (f" {baseline / seconds:>6.1f}x" if baseline else ""))
+
+    for processes in args.processes:
+        engine = GrepEngine(walker, processes=processes)
+        engine.grep("warm up", args.corpus, max_results=1)
+        started = time.perf_counter()
+        records, truncated = engine.grep(NEEDLE, args.corpus, max_results=0)
+        seconds = time.perf_counter() - started
+        engine.close()
+        if expected is not None:
+            assert len(records) == expected, f"{len(records)} != {expected}"
+        print(f"{f'mmap, {processes} processes':<22}{len(records):>9} matches {seconds:>8.2f}s"
+              + (f" {baseline / seconds:>6.1f}x" if baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare ParallelWalker at several thread counts with os.walk on a generated tree
+
+Usage: python bench_parallel_walker.py --dirs 2000 --files-per-dir 50 --threads 1 4 16
+Pass --root to benchmark an existing tree (e.g. a network share) instead. A freshly
+generated tree sits in the page cache, where the walk is bound by the GIL rather
+than by readdir/stat latency, so expect the thread gains to show up on network
+shares and cold disks rather than here.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from parallel_walker import ParallelWalker
+from bench_trigram_index import make_tree
+
+
+def count_os_walk(root, with_stat):
+    count = 0
+    for current, dirs, files in os.walk(root):
+        for name in dirs + files:
+            if with_stat:
+                os.lstat(os.path.join(current, name))
+            count += 1
+    return count
+
+
+def count_parallel(root, threads, with_stat):
+    walker = ParallelWalker(threads=threads)
+    return sum(1 for _ in walker.walk(root, with_stat=with_stat))
+
+
+def timed(repeats, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--files-per-dir", type=int, default=50)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stat", action="store_true", help="Also stat every entry, as directory sizing does")
+    parser.add_argument("--root", help="Benchmark an existing tree instead of generating one")
+    args = parser.parse_args()
+
+    temp_root = None
+    root = args.root
+    if not root:
+        temp_root = tempfile.mkdtemp(prefix="filewise_walk_bench_")
+        root = temp_root
+        print(f"Generating {args.dirs * args.files_per_dir} files under {root} ...")
+        make_tree(root, args.dirs, args.files_per_dir)
+
+    try:
+        baseline, expected = timed(args.repeats, count_os_walk, root, args.stat)
+        print(f"{'walker':<20}{'entries':>10}{'seconds':>10}{'speedup':>10}")
+        print(f"{'os.walk':<20}{expected:>10}{baseline:>10.3f}{1:>9.1f}x")
+        for threads in args.threads:
+            seconds, count = timed(args.repeats, count_parallel, root, threads, args.stat)
+            assert count == expected, f"{threads} threads saw {count} entries, os.walk saw {expected}"
+            print(f"{f'parallel x{threads}':<20}{count:>10}{seconds:>10.3f}{baseline / seconds:>9.1f}x")
+    finally:
+        if temp_root:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare the trigram filename index with the walk-and-scan search on a synthetic tree
+
+Usage: python bench_trigram_index.py --dirs 500 --files-per-dir 200
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from trigram_index import TrigramIndex
+
+WORDS = [
+    "report", "budget", "invoice", "photo", "draft", "notes", "final", "summary",
+    "data", "backup", "archive", "resume", "project", "meeting", "vacation", "thesis",
+]
+EXTENSIONS = [".txt", ".pdf", ".docx", ".xlsx", ".jpg", ".png", ".py", ".csv"]
+QUERIES = ["budget", "inv", "final_report", "2024", "zzz_not_there", "a"]
+
+
+def make_tree(root, dirs, files_per_dir, seed=0):
+    rng = random.Random(seed)
+    for d in range(dirs):
+        folder = os.path.join(root, f"{rng.choice(WORDS)}_{d // 50}", f"{rng.choice(WORDS)}_{d}")
+        os.makedirs(folder, exist_ok=True)
+        for f in range(files_per_dir):
+            name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{rng.randint(2000, 2030)}_{f}{rng.choice(EXTENSIONS)}"
+            open(os.path.join(folder, name), "w").close()
+
+
+def walk_and_scan(root, keyword):
+    """The search loop _search_item used before the index existed"""
+    results = {"files": [], "folders": []}
+    for current, dirs, files in os.walk(root):
+        for d in dirs:
+            if keyword.lower() in d.lower():
+                results["folders"].append(os.path.join(current, d))
+        for f in files:
+            if keyword.lower() in f.lower():
+                results["files"].append(os.path.join(current, f))
+    return results
+
+
+def build_index(root):
+    index = TrigramIndex()
+    paths = []
+    for current, dirs, files in os.walk(root):
+        for name in dirs:
+            index.add(len(paths), name, True)
+            paths.append(os.path.join(current, name))
+        for name in files:
+            index.add(len(paths), name, False)
+            paths.append(os.path.join(current, name))
+    return index, paths
+
+
+def best_of(repeats, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=500)
+    parser.add_argument("--files-per-dir", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--root", help="Benchmark an existing tree instead of generating one")
+    args = parser.parse_args()
+
+    temp_root = None
+    root = args.root
+    if not root:
+        temp_root = tempfile.mkdtemp(prefix="filewise_bench_")
+        root = temp_root
+        print(f"Generating {args.dirs * args.files_per_dir} files under {root} ...")
+        make_tree(root, args.dirs, args.files_per_dir)
+
+    try:
+        started = time.perf_counter()
+        index, paths = build_index(root)
+        build_seconds = time.perf_counter() - started
+        print(f"Indexed {len(index)} entries in {build_seconds:.2f}s, "
+              f"{index.memory_bytes() / len(index):.1f} bytes/entry in buffers and postings")
+
+        print(f"{'query':<16}{'matches':>9}{'walk ms':>12}{'index ms':>12}{'speedup':>10}")
+        for keyword in QUERIES:
+            walk_seconds, walked = best_of(args.repeats, walk_and_scan, root, keyword)
+            index_seconds, ids = best_of(args.repeats, index.query, keyword)
+            expected = len(walked["files"]) + len(walked["folders"])
+            assert expected == len(ids), f"mismatch for {keyword!r}: {expected} vs {len(ids)}"
+            speedup = walk_seconds / index_seconds if index_seconds else float("inf")
+            print(f"{keyword:<16}{len(ids):>9}{walk_seconds * 1000:>12.1f}{index_seconds * 1000:>12.2f}{speedup:>9.0f}x")
+    finally:
+        if temp_root:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
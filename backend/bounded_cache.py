@@ -0,0 +1,189 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(obj, _seen=None):
+    """Approximate deep size in bytes of plain containers, strings and numbers"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    elif hasattr(obj, "indptr"):
+        # scipy sparse matrix: the payload lives in its arrays, not the object
+        size += obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    return size
+
+
+class BoundedCache:
+    """Dict-like LRU cache capped by total estimated bytes, with per-entry TTL
+
+    Reads through get() refresh recency and count as hits or misses; iterating
+    (keys/values/items) neither reorders entries nor touches the counters, so
+    background scans do not distort the statistics. Entries past their TTL are
+    dropped lazily whenever the cache is touched. on_evict(key, value) runs for
+    every entry removed by eviction or expiry.
+    """
+
+    def __init__(self, max_bytes, default_ttl=None, max_entries=None, on_evict=None):
+        self.max_bytes = int(max_bytes)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._lock = threading.RLock()
+        # key -> (value, size, expires_at)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._expire()
+            return key in self._entries
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        size = estimate_size(value)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return False
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            self._expire()
+            self._shrink()
+        return True
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._drop(key, expired=True)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys):
+        """get() for several keys at once; one miss is counted if none is present"""
+        found = []
+        with self._lock:
+            self._expire()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found.append((key, entry[0]))
+            self.hits += len(found)
+            self.misses += not found
+        return found
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._discard(key)
+        return default if entry is None else entry[0]
+
+    def resize(self, key):
+        """Re-measure an entry whose value was changed in place"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            size = estimate_size(entry[0])
+            self._entries[key] = (entry[0], size, entry[2])
+            self._bytes += size - entry[1]
+            self._shrink()
+
+    def set_max_bytes(self, max_bytes):
+        """Change the byte cap; lowering it evicts least recently used entries at once"""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._shrink()
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def items(self):
+        with self._lock:
+            self._expire()
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.default_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # -------------------- INTERNALS --------------------
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry
+
+    def _drop(self, key, expired=False):
+        entry = self._discard(key)
+        if entry is None:
+            return
+        if expired:
+            self.expirations += 1
+        else:
+            self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, entry[0])
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if entry[2] is not None and entry[2] <= now]:
+            self._drop(key, expired=True)
+
+    def _shrink(self):
+        # Oldest (least recently used) first
+        while self._entries and (
+            self._bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            self._drop(next(iter(self._entries)))
@@ -0,0 +1,110 @@
+import re
+import threading
+
+from context_builder import estimate_tokens
+
+SYSTEM_ACK = "Understood. I am FileWise. Ready to assist."
+MEMORY_ACK = "Noted. I will use this summary of our earlier conversation."
+# Rebuild the chat once the history is estimated above this many tokens
+DEFAULT_TOKEN_LIMIT = 8000
+# Most recent turns kept verbatim after a rebuild
+DEFAULT_KEEP_TURNS = 4
+MEMORY_BLOCK_TOKENS = 400
+# A rebuild folds turns until the history is below this share of the limit, so it is not repeated every turn
+LOW_WATER = 0.75
+SUMMARY_LINE_CHARS = 120
+
+
+def _summary_line(user_text, model_text):
+    """One line for an old turn: the user's words (prompt context stripped) and the command that answered"""
+    user = user_text.rsplit("User: ", 1)[-1].strip().strip("'")
+    command = re.search(r'"command"\s*:\s*"([^"]+)"', model_text)
+    answer = command.group(1) if command else model_text.strip().replace("\n", " ")
+    return f"- {user[:SUMMARY_LINE_CHARS]} -> {answer[:SUMMARY_LINE_CHARS]}"
+
+
+class BoundedChat:
+    """A Gemini chat that keeps the system prompt plus a rolling window of turns
+
+    Turns are mirrored locally with a token estimate. Once the total passes
+    token_limit, everything but the last keep_turns (fewer if they alone are
+    still above LOW_WATER of the limit) is folded into a compact memory block (one line per turn, oldest lines dropped first) and the chat
+    is restarted from the system prompt, the memory block and the kept turns.
+
+    model is a GenerativeModel or a ModelRouter; the router waits for quota
+    and picks the model for every message.
+    """
+
+    def __init__(self, model, system_prompt, token_limit=DEFAULT_TOKEN_LIMIT, keep_turns=DEFAULT_KEEP_TURNS):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.token_limit = token_limit
+        self.keep_turns = keep_turns
+        self._lock = threading.Lock()
+        self._turns = []
+        self._memory_lines = []
+        self.compactions = 0
+        self._chat = self._start()
+
+    def _base_history(self):
+        history = [
+            {"role": "user", "parts": [self.system_prompt]},
+            {"role": "model", "parts": [SYSTEM_ACK]},
+        ]
+        if self._memory_lines:
+            block = "Summary of the earlier conversation:\n" + "\n".join(self._memory_lines)
+            history += [
+                {"role": "user", "parts": [block]},
+                {"role": "model", "parts": [MEMORY_ACK]},
+            ]
+        return history
+
+    def _start(self):
+        history = self._base_history()
+        for user_text, model_text, _ in self._turns:
+            history += [
+                {"role": "user", "parts": [user_text]},
+                {"role": "model", "parts": [model_text]},
+            ]
+        return self.model.start_chat(history=history)
+
+    def history_tokens(self):
+        base = sum(estimate_tokens(part) for item in self._base_history() for part in item["parts"])
+        return base + sum(tokens for _, _, tokens in self._turns)
+
+    async def send_message_async(self, message):
+        """Send one turn; the caller's session lock keeps the turns of one chat in order"""
+        response = await self._chat.send_message_async(message)
+        with self._lock:
+            self._record(message, response)
+        return response
+
+    def _record(self, message, response):
+        self._turns.append((message, response.text, estimate_tokens(message) + estimate_tokens(response.text)))
+        if len(self._turns) > 1 and self.history_tokens() > self.token_limit:
+            self._compact()
+
+    def _compact(self):
+        split = max(0, len(self._turns) - self.keep_turns)
+        old, self._turns = self._turns[:split], self._turns[split:]
+        while len(self._turns) > 1 and self.history_tokens() > self.token_limit * LOW_WATER:
+            old.append(self._turns.pop(0))
+        self._memory_lines.extend(_summary_line(user_text, model_text) for user_text, model_text, _ in old)
+        while self._memory_lines and sum(estimate_tokens(line) for line in self._memory_lines) > MEMORY_BLOCK_TOKENS:
+            self._memory_lines.pop(0)
+        self._chat = self._start()
+        self.compactions += 1
+
+    def reset(self):
+        with self._lock:
+            self._turns, self._memory_lines = [], []
+            self._chat = self._start()
+
+    def status(self):
+        return {
+            "turns": len(self._turns),
+            "summarized_turns": len(self._memory_lines),
+            "history_tokens": self.history_tokens(),
+            "token_limit": self.token_limit,
+            "compactions": self.compactions,
+        }
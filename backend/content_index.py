@@ -0,0 +1,278 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+SCHEMA_VERSION = 1
+DEFAULT_CONTENT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".filewise", "content_index.db")
+MAX_FILE_BYTES = 2 * 1024 * 1024
+SNIFF_BYTES = 8192
+COMMIT_EVERY = 500
+
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".rst", ".log", ".csv", ".tsv", ".json", ".xml", ".yaml", ".yml",
+    ".ini", ".cfg", ".conf", ".toml", ".html", ".htm", ".css", ".tex", ".sql",
+    ".py", ".js", ".ts", ".jsx", ".tsx", ".java", ".c", ".h", ".cpp", ".hpp", ".cs",
+    ".go", ".rs", ".rb", ".php", ".sh", ".bat", ".cmd", ".ps1", ".r", ".kt", ".swift",
+}
+
+
+def is_text_file(path):
+    """Cheap text check: known extension and no NUL byte in the first few KB"""
+    if os.path.splitext(path)[1].lower() not in TEXT_EXTENSIONS:
+        return False
+    try:
+        with open(path, "rb") as f:
+            return b"\0" not in f.read(SNIFF_BYTES)
+    except OSError:
+        return False
+
+
+def to_match_query(query):
+    """Turn free text into an FTS5 query: every word must appear, quoted phrases kept"""
+    phrases = re.findall(r'"([^"]+)"', query)
+    words = re.findall(r"\w+", re.sub(r'"[^"]*"', " ", query))
+    terms = ['"' + p.replace('"', '""') + '"' for p in phrases] + [f'"{w}"' for w in words]
+    return " ".join(terms)
+
+
+class ContentIndex:
+    """Persistent SQLite FTS5 word index over text files under configured roots
+
+    Files are only re-read when their mtime or size changed, so refreshing a root
+    costs one stat per file and queries never touch the files themselves.
+    """
+
+    def __init__(self, db_path=DEFAULT_CONTENT_INDEX_PATH, walker=None, ignore_provider=None):
+        self.db_path = db_path
+        self.walker = walker
+        self.ignore_provider = ignore_provider
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.executescript("""
+                    DROP TABLE IF EXISTS content;
+                    DROP TABLE IF EXISTS docs;
+                    DROP TABLE IF EXISTS content_roots;
+                """)
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS content_roots (
+                    root TEXT PRIMARY KEY,
+                    refreshed_at REAL,
+                    file_count INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL UNIQUE,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS docs_root ON docs(root);
+                CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(body, tokenize='unicode61');
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+            self._conn.commit()
+
+    # -------------------- ROOTS --------------------
+
+    def root_paths(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT root FROM content_roots").fetchall()]
+
+    def covering_root(self, path):
+        path = os.path.normcase(os.path.abspath(path))
+        best = None
+        for indexed_root in self.root_paths():
+            root = os.path.normcase(indexed_root)
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                if best is None or len(indexed_root) > len(best):
+                    best = indexed_root
+        return best
+
+    def _files(self, root):
+        rules = self.ignore_provider(root) if self.ignore_provider else None
+        ignore = rules.walker_filter() if rules else None
+        if self.walker is not None:
+            for entry in self.walker.walk(root, ignore=ignore):
+                if not entry.is_dir:
+                    yield entry.path
+            return
+        for current, dirs, files in os.walk(root):
+            if ignore is not None:
+                dirs[:] = [d for d in dirs if not ignore(os.path.join(current, d), d, True)]
+            for name in files:
+                path = os.path.join(current, name)
+                if ignore is None or not ignore(path, name, False):
+                    yield path
+
+    def refresh(self, root):
+        """Add root to the configured roots and bring its index up to date
+
+        Unchanged files (same mtime and size) are skipped, changed ones re-read and
+        vanished ones dropped.
+        """
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            return {"error": f"Content root does not exist: {root}"}
+
+        started = time.time()
+        with self._lock:
+            known = {
+                path: (doc_id, mtime_ns, size)
+                for doc_id, path, mtime_ns, size in self._conn.execute(
+                    "SELECT id, path, mtime_ns, size FROM docs WHERE root = ?", (root,)
+                )
+            }
+
+        seen = set()
+        updated = 0
+        for path in self._files(root):
+            if os.path.splitext(path)[1].lower() not in TEXT_EXTENSIONS:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            previous = known.get(path)
+            if previous and previous[1] == st.st_mtime_ns and previous[2] == st.st_size:
+                continue
+            if self._index_file(root, path, st):
+                updated += 1
+                if updated % COMMIT_EVERY == 0:
+                    with self._lock:
+                        self._conn.commit()
+
+        removed = [path for path in known if path not in seen]
+        with self._lock:
+            for path in removed:
+                self._remove_doc(path)
+            count = self._conn.execute("SELECT COUNT(*) FROM docs WHERE root = ?", (root,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_roots(root, refreshed_at, file_count) VALUES (?, ?, ?)",
+                (root, time.time(), count),
+            )
+            self._conn.commit()
+
+        return {
+            "message": f"Content index for '{root}' is up to date ({count} text files)",
+            "root": root,
+            "file_count": count,
+            "updated": updated,
+            "removed": len(removed),
+            "refresh_seconds": round(time.time() - started, 2),
+        }
+
+    def drop(self, root):
+        root = os.path.abspath(root)
+        with self._lock:
+            for (path,) in self._conn.execute("SELECT path FROM docs WHERE root = ?", (root,)).fetchall():
+                self._remove_doc(path)
+            self._conn.execute("DELETE FROM content_roots WHERE root = ?", (root,))
+            self._conn.commit()
+
+    # -------------------- DOCUMENTS --------------------
+
+    def _index_file(self, root, path, st=None):
+        try:
+            st = st or os.stat(path)
+            if st.st_size > MAX_FILE_BYTES or not is_text_file(path):
+                with self._lock:
+                    self._remove_doc(path)
+                return False
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                body = f.read()
+        except OSError:
+            return False
+
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM docs WHERE path = ?", (path,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM content WHERE rowid = ?", (row[0],))
+                self._conn.execute(
+                    "UPDATE docs SET mtime_ns = ?, size = ? WHERE id = ?", (st.st_mtime_ns, st.st_size, row[0])
+                )
+                doc_id = row[0]
+            else:
+                doc_id = self._conn.execute(
+                    "INSERT INTO docs(root, path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                    (root, path, st.st_mtime_ns, st.st_size),
+                ).lastrowid
+            self._conn.execute("INSERT INTO content(rowid, body) VALUES (?, ?)", (doc_id, body))
+        return True
+
+    def _remove_doc(self, path):
+        row = self._conn.execute("SELECT id FROM docs WHERE path = ?", (path,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM content WHERE rowid = ?", (row[0],))
+            self._conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    def _remove_tree(self, path):
+        prefix = path.rstrip(os.sep) + os.sep
+        rows = self._conn.execute(
+            "SELECT path FROM docs WHERE path = ? OR substr(path, 1, ?) = ?", (path, len(prefix), prefix)
+        ).fetchall()
+        for (doc_path,) in rows:
+            self._remove_doc(doc_path)
+
+    def apply_fs_event(self, kind, path, destination=None):
+        """Incrementally apply a watcher event to the files under configured roots"""
+        with self._lock:
+            if kind in ("deleted", "moved"):
+                self._remove_tree(path)
+            target = destination if kind == "moved" else path
+            if kind in ("created", "modified", "moved") and target:
+                root = self.covering_root(target)
+                if root:
+                    rules = self.ignore_provider(root) if self.ignore_provider else None
+                    if os.path.isdir(target):
+                        files = [p for p in self._files(target) if not (rules and rules.is_path_ignored(p))]
+                    elif not (rules and rules.is_path_ignored(target)):
+                        files = [target]
+                    else:
+                        files = []
+                    for file_path in files:
+                        self._index_file(root, file_path)
+            self._conn.commit()
+
+    # -------------------- QUERYING --------------------
+
+    def search(self, query, search_path=None, max_results=20):
+        """Ranked full-text search returning path and a highlighted snippet per file"""
+        match = to_match_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT d.path, snippet(content, 0, '[', ']', '...', 12) FROM content "
+            "JOIN docs d ON d.id = content.rowid WHERE content MATCH ?"
+        )
+        args = [match]
+        if search_path:
+            prefix = os.path.abspath(search_path).rstrip(os.sep) + os.sep
+            sql += " AND substr(d.path, 1, ?) = ?"
+            args += [len(prefix), prefix]
+        sql += " ORDER BY bm25(content) LIMIT ?"
+        args.append(int(max_results))
+        with self._lock:
+            return [{"path": path, "snippet": snippet} for path, snippet in self._conn.execute(sql, args)]
+
+    def status(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT root, refreshed_at, file_count FROM content_roots ORDER BY root").fetchall()
+        db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {
+            "index_path": self.db_path,
+            "roots": [{"root": r[0], "refreshed_at": r[1], "file_count": r[2]} for r in rows],
+            "index_size_mb": round(db_size / (1024 * 1024), 2),
+        }
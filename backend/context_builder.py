@@ -0,0 +1,123 @@
+import json
+import math
+import re
+
+DEFAULT_TOKEN_BUDGET = 600
+CHARS_PER_TOKEN = 4
+# Payload limits applied before a turn is rendered
+MAX_STRING_CHARS = 160
+MAX_LIST_ITEMS = 5
+# Keys whose values are bulk data (file bodies, code); only their size is kept
+BULK_KEYS = {"content", "code", "text", "data"}
+# Relevance gained by a turn for each step closer to now
+RECENCY_WEIGHT = 0.15
+# The newest turns are always candidates; older ones only when they share terms with the prompt
+RECENT_TURNS = 3
+
+
+def estimate_tokens(text):
+    """Rough token count: Gemini averages about four characters per token for English and paths"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "from", "with", "my", "me", "i",
+    "it", "is", "are", "was", "what", "s", "this", "that", "please", "can", "you", "command", "parameters",
+}
+
+
+def _terms(text):
+    return set(re.findall(r"\w+", str(text).lower())) - STOPWORDS
+
+
+def elide(value, depth=0):
+    """Shrink a JSON-like payload: long strings cut, long lists summarised, bulk fields replaced by their size"""
+    if isinstance(value, dict):
+        if depth > 3:
+            return "{...}"
+        compact = {}
+        for key, item in value.items():
+            if callable(item):
+                continue
+            if key in BULK_KEYS and isinstance(item, str) and len(item) > MAX_STRING_CHARS:
+                compact[key] = f"<{len(item)} chars>"
+            else:
+                compact[key] = elide(item, depth + 1)
+        return compact
+    if isinstance(value, (list, tuple)):
+        items = [elide(item, depth + 1) for item in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"... {len(value) - MAX_LIST_ITEMS} more")
+        return items
+    if isinstance(value, str) and len(value) > MAX_STRING_CHARS:
+        return value[:MAX_STRING_CHARS] + f"... <{len(value) - MAX_STRING_CHARS} more chars>"
+    return value
+
+
+def summarize_result(result):
+    """One line describing what a command produced"""
+    if not isinstance(result, dict):
+        return str(elide(result))
+    if "error" in result:
+        return f"Error - {elide(result['error'])}"
+    if "message" in result:
+        return str(elide(result["message"]))
+    found = result.get("results")
+    if isinstance(found, dict):
+        paths = found.get("files", []) + found.get("folders", [])
+        return f"{result.get('total_found', len(paths))} matches: {json.dumps(elide(paths))}"
+    if "matches" in result:
+        return f"{result.get('total_found', len(result['matches']))} matches: {json.dumps(elide(result['matches']))}"
+    return json.dumps(elide(result), default=str)
+
+
+class ContextBuilder:
+    """Build the "Previous conversation" block under a token budget
+
+    Turns are ranked by term overlap with the new prompt plus a recency bonus;
+    the latest turn always gets in so "open it" style follow-ups still resolve,
+    and turns older than the last RECENT_TURNS need at least one shared term.
+    Chosen turns are rendered oldest first with large payloads elided.
+    """
+
+    def __init__(self, budget_tokens=DEFAULT_TOKEN_BUDGET):
+        self.budget_tokens = budget_tokens
+
+    def render_turn(self, interaction):
+        command = interaction.get("agent_response")
+        text = f"User: {interaction.get('user_input', '')}\n"
+        text += f"Agent: {json.dumps(elide(command), default=str)}\n"
+        text += f"Result: {summarize_result(interaction.get('command_result', {}))}\n"
+        return text + "---\n"
+
+    def build(self, history, user_prompt="", budget_tokens=None):
+        if not history:
+            return "No previous conversation."
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        header = "Previous conversation:\n"
+        budget -= estimate_tokens(header)
+
+        prompt_terms = _terms(user_prompt)
+        last = len(history) - 1
+        ranked = []
+        for index, interaction in enumerate(history):
+            turn_terms = _terms(interaction.get("user_input", "")) | _terms(interaction.get("agent_response", ""))
+            overlap = len(prompt_terms & turn_terms) / len(prompt_terms) if prompt_terms else 0.0
+            recency = RECENCY_WEIGHT * (index - last)
+            if overlap == 0 and last - index >= RECENT_TURNS:
+                continue
+            # The latest turn is always first in line
+            ranked.append((math.inf if index == last else overlap + recency, index))
+        ranked.sort(reverse=True)
+
+        chosen = {}
+        for _, index in ranked:
+            rendered = self.render_turn(history[index])
+            cost = estimate_tokens(rendered)
+            if cost > budget:
+                continue
+            chosen[index] = rendered
+            budget -= cost
+        if not chosen:
+            return "No previous conversation."
+        return header + "".join(chosen[index] for index in sorted(chosen))
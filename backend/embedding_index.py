@@ -0,0 +1,339 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+
+import numpy as np
+
+DEFAULT_EMBEDDING_DIR = os.path.join(os.path.expanduser("~"), ".filewise", "embeddings")
+DIM = 128
+NGRAM = 3
+# Parent folder words count for less than the file's own name
+FOLDER_WEIGHT = 0.5
+BUILD_BATCH = 20000
+KMEANS_SAMPLE = 50000
+KMEANS_ITERATIONS = 8
+DEFAULT_NPROBE = 8
+
+# Words people use for a file type rather than its extension
+EXTENSION_WORDS = {
+    ".xls": "spreadsheet excel sheet", ".xlsx": "spreadsheet excel sheet", ".csv": "spreadsheet table data",
+    ".doc": "document word", ".docx": "document word", ".odt": "document", ".rtf": "document",
+    ".pdf": "pdf document", ".txt": "text notes", ".md": "notes markdown",
+    ".ppt": "presentation slides powerpoint", ".pptx": "presentation slides powerpoint",
+    ".jpg": "photo image picture", ".jpeg": "photo image picture", ".png": "image picture screenshot",
+    ".gif": "image animation", ".mp4": "video movie", ".mov": "video movie", ".mkv": "video movie",
+    ".mp3": "audio music song", ".wav": "audio sound", ".zip": "archive compressed", ".rar": "archive compressed",
+    ".py": "python code script", ".js": "javascript code script", ".exe": "program application installer",
+}
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class HashedEmbedder:
+    """Feature-hashed character trigram + word vectors, L2 normalised float32
+
+    Buckets come from crc32 so vectors are identical across processes, which
+    matters because they are persisted. The (bucket, sign) of every feature is
+    memoised; file names reuse a small vocabulary of grams.
+    """
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self._features = {}
+
+    def _feature(self, token):
+        feature = self._features.get(token)
+        if feature is None:
+            h = zlib.crc32(token.encode("utf-8"))
+            feature = self._features[token] = (h % self.dim, 1.0 if (h >> 31) & 1 else -1.0)
+        return feature
+
+    def _add(self, row, text, weight, cols, vals, rows):
+        words = _words(text)
+        for word in words:
+            bucket, sign = self._feature("w:" + word)
+            rows.append(row)
+            cols.append(bucket)
+            vals.append(sign * weight)
+        padded = " " + " ".join(words) + " "
+        for i in range(len(padded) - NGRAM + 1):
+            bucket, sign = self._feature(padded[i:i + NGRAM])
+            rows.append(row)
+            cols.append(bucket)
+            vals.append(sign * weight)
+
+    def embed_query(self, text):
+        return self.embed([(text, "")])[0]
+
+    def embed(self, items):
+        """items: [(name_text, folder_text)] -> (len(items), dim) float32"""
+        rows, cols, vals = [], [], []
+        for row, (name_text, folder_text) in enumerate(items):
+            self._add(row, name_text, 1.0, cols, vals, rows)
+            if folder_text:
+                self._add(row, folder_text, FOLDER_WEIGHT, cols, vals, rows)
+        matrix = np.zeros((len(items), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)), np.array(vals, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def describe(path, name, is_dir):
+    """(name text, folder text) embedded for one entry"""
+    stem, ext = os.path.splitext(name)
+    if is_dir:
+        stem, ext = name, ""
+    name_text = stem + " " + EXTENSION_WORDS.get(ext.lower(), ext.lstrip("."))
+    parent = os.path.basename(os.path.dirname(path))
+    return name_text, parent
+
+
+class EmbeddingIndex:
+    """Approximate nearest-neighbour index over every filename in the FileIndex
+
+    Vectors are written to a memory-mapped float32 matrix sorted by IVF list:
+    spherical k-means centroids partition the rows, and a query only scans the
+    nprobe lists whose centroids are closest, taking in further lists until
+    enough rows pass the path and type filters. Each build goes to a fresh
+    directory and is switched in atomically, so queries keep using the old
+    build until the new one is complete. Rows are stored with their paths,
+    not FileIndex rowids, which SQLite reuses after a rebuild; the paths are
+    one memory-mapped byte buffer addressed by an offsets table. Results whose
+    path has left the FileIndex since the build are dropped; new files appear
+    after the next build, and status() reports the build as stale meanwhile.
+    """
+
+    def __init__(self, file_index, directory=DEFAULT_EMBEDDING_DIR, dim=DIM):
+        self.file_index = file_index
+        self.directory = directory
+        self.embedder = HashedEmbedder(dim)
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._building = False
+
+    # -------------------- BUILDING --------------------
+
+    def build(self, nlist=None):
+        """Embed every indexed entry and train the IVF lists; returns build stats"""
+        with self._lock:
+            if self._building:
+                return {"error": "A semantic index build is already running"}
+            self._building = True
+        try:
+            return self._build(nlist)
+        finally:
+            self._building = False
+
+    def _build(self, nlist):
+        started = time.time()
+        build_dir = os.path.join(self.directory, f"build_{int(started * 1000)}")
+        os.makedirs(build_dir, exist_ok=True)
+        raw_path = os.path.join(build_dir, "unsorted.f32")
+
+        paths, dirs = [], []
+        count = 0
+        with open(raw_path, "wb") as raw:
+            for rows in self.file_index.iter_entries(BUILD_BATCH):
+                vectors = self.embedder.embed([describe(path, name, is_dir) for _, path, name, is_dir in rows])
+                raw.write(vectors.tobytes())
+                paths.extend(row[1] for row in rows)
+                dirs.extend(bool(row[3]) for row in rows)
+                count += len(rows)
+        if count == 0:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return {"error": "The filename index is empty; build it with rebuild_index first"}
+
+        dim = self.embedder.dim
+        unsorted = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(count, dim))
+        nlist = int(nlist or min(4096, max(1, int(np.sqrt(count)))))
+        centroids = self._train(unsorted, nlist)
+        assignment = np.empty(count, dtype=np.int32)
+        for start in range(0, count, BUILD_BATCH):
+            assignment[start:start + BUILD_BATCH] = np.argmax(unsorted[start:start + BUILD_BATCH] @ centroids.T, axis=1)
+
+        # Rewrite rows grouped by list so every list is one contiguous slice
+        order = np.argsort(assignment, kind="stable")
+        vectors = np.memmap(os.path.join(build_dir, "vectors.f32"), dtype=np.float32, mode="w+", shape=(count, dim))
+        for start in range(0, count, BUILD_BATCH):
+            rows = order[start:start + BUILD_BATCH]
+            # Read the source rows in file order, then place them in list order
+            by_position = np.argsort(rows)
+            block = np.empty((len(rows), dim), dtype=np.float32)
+            block[by_position] = unsorted[rows[by_position]]
+            vectors[start:start + len(rows)] = block
+        vectors.flush()
+        del vectors, unsorted
+        os.remove(raw_path)
+
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+        # surrogateescape keeps undecodable names intact
+        path_offsets = np.zeros(count + 1, dtype=np.int64)
+        with open(os.path.join(build_dir, "paths.bin"), "wb") as f:
+            for row, i in enumerate(order):
+                encoded = paths[i].encode("utf-8", "surrogateescape")
+                f.write(encoded)
+                path_offsets[row + 1] = path_offsets[row] + len(encoded)
+        np.save(os.path.join(build_dir, "path_offsets.npy"), path_offsets)
+        np.save(os.path.join(build_dir, "dirs.npy"), np.asarray(dirs, dtype=bool)[order])
+        np.save(os.path.join(build_dir, "centroids.npy"), centroids)
+        np.save(os.path.join(build_dir, "offsets.npy"), offsets)
+        meta = {"build": os.path.basename(build_dir), "count": count, "dim": dim, "nlist": nlist,
+                "built_at": time.time(), "build_seconds": round(time.time() - started, 2)}
+        with open(os.path.join(build_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        current = os.path.join(self.directory, "current.json")
+        with open(current + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(current + ".tmp", current)
+        with self._lock:
+            self._loaded = None
+        self._remove_old_builds(keep=meta["build"])
+        return {"message": f"Semantic index built over {count} entries", **meta}
+
+    def _train(self, vectors, nlist):
+        """Spherical k-means on a sample of rows"""
+        rng = np.random.default_rng(0)
+        count = vectors.shape[0]
+        sample = np.sort(rng.choice(count, size=min(count, max(KMEANS_SAMPLE, nlist)), replace=False))
+        data = np.asarray(vectors[sample])
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            empty = np.flatnonzero(~sums.any(axis=1))
+            if len(empty):
+                # Reseed empty lists from random rows
+                sums[empty] = data[rng.choice(len(data), size=len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        return centroids
+
+    def _remove_old_builds(self, keep):
+        for name in os.listdir(self.directory):
+            if name.startswith("build_") and name != keep:
+                # Windows refuses while an old memmap is still open; the next build retries
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    # -------------------- QUERYING --------------------
+
+    def _load(self):
+        with self._lock:
+            if self._loaded is not None:
+                return self._loaded
+            try:
+                with open(os.path.join(self.directory, "current.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            build_dir = os.path.join(self.directory, meta["build"])
+            if not os.path.exists(os.path.join(build_dir, "path_offsets.npy")):
+                # Built by a version that kept rowids or NUL-joined paths; needs a rebuild
+                return None
+            self._loaded = {
+                "meta": meta,
+                "vectors": np.memmap(os.path.join(build_dir, "vectors.f32"), dtype=np.float32, mode="r",
+                                     shape=(meta["count"], meta["dim"])),
+                "paths": np.memmap(os.path.join(build_dir, "paths.bin"), dtype=np.uint8, mode="r"),
+                "path_offsets": np.load(os.path.join(build_dir, "path_offsets.npy"), mmap_mode="r"),
+                "dirs": np.load(os.path.join(build_dir, "dirs.npy"), mmap_mode="r"),
+                "centroids": np.load(os.path.join(build_dir, "centroids.npy")),
+                "offsets": np.load(os.path.join(build_dir, "offsets.npy")),
+            }
+            return self._loaded
+
+    @staticmethod
+    def _path(loaded, row):
+        offsets = loaded["path_offsets"]
+        return loaded["paths"][offsets[row]:offsets[row + 1]].tobytes().decode("utf-8", "surrogateescape")
+
+    @staticmethod
+    def _under(loaded, rows, prefix):
+        """Mask of rows whose stored path starts with the encoded prefix, compared in the mapped bytes"""
+        starts = loaded["path_offsets"][rows]
+        long_enough = loaded["path_offsets"][rows + 1] - starts >= len(prefix)
+        mask = np.zeros(len(rows), dtype=bool)
+        if long_enough.any():
+            heads = loaded["paths"][starts[long_enough, None] + np.arange(len(prefix))]
+            mask[long_enough] = (heads == np.frombuffer(prefix, dtype=np.uint8)).all(axis=1)
+        return mask
+
+    def is_built(self):
+        return self._load() is not None
+
+    def search(self, query, search_path=None, max_results=10, nprobe=DEFAULT_NPROBE, search_type="both"):
+        """Return [(path, is_dir, score)] for the entries closest to query"""
+        loaded = self._load()
+        if loaded is None:
+            return []
+        vector = self.embedder.embed_query(query)
+        centroids, offsets = loaded["centroids"], loaded["offsets"]
+        ranked = np.argsort(centroids @ vector)[::-1]
+        prefix = None
+        if search_path:
+            prefix = (os.path.abspath(search_path).rstrip(os.sep) + os.sep).encode("utf-8", "surrogateescape")
+        want_dir = {"file": False, "folder": True}.get(search_type)
+
+        # Filter rows inside each probed list; a narrow search_path or type leaves few of them, so
+        # keep probing (twice as many lists each round) until max_results survive or every list is read
+        candidate_rows, candidate_scores = [], []
+        probed, step = 0, max(1, nprobe)
+        while probed < len(ranked):
+            for list_id in ranked[probed:probed + step]:
+                start, end = offsets[list_id], offsets[list_id + 1]
+                if start == end:
+                    continue
+                rows = np.arange(start, end)
+                keep = np.ones(len(rows), dtype=bool)
+                if want_dir is not None:
+                    keep &= loaded["dirs"][start:end] == want_dir
+                if prefix is not None:
+                    keep[keep] = self._under(loaded, rows[keep], prefix)
+                if keep.any():
+                    candidate_rows.append(rows[keep])
+                    candidate_scores.append(loaded["vectors"][rows[keep]] @ vector)
+            probed += step
+            step *= 2
+            if probed < len(ranked) and sum(len(rows) for rows in candidate_rows) >= max_results:
+                results = self._rank(loaded, np.concatenate(candidate_rows), np.concatenate(candidate_scores),
+                                     max_results)
+                if len(results) >= max_results:
+                    return results
+        if not candidate_rows:
+            return []
+        return self._rank(loaded, np.concatenate(candidate_rows), np.concatenate(candidate_scores), max_results)
+
+    def _rank(self, loaded, rows, scores, max_results):
+        """Best max_results of already filtered rows whose path is still in the FileIndex"""
+        # Over-fetch so the rows deleted since the build still leave max_results
+        wanted = min(len(scores), max_results * 8 + 32)
+        top = np.argpartition(scores, -wanted)[-wanted:]
+        top = top[np.argsort(scores[top])[::-1]]
+        paths = [self._path(loaded, rows[i]) for i in top]
+        indexed = self.file_index.indexed_paths(paths)
+        results = []
+        for i, path in zip(top, paths):
+            if path in indexed:
+                results.append((path, bool(loaded["dirs"][rows[i]]), float(scores[i])))
+                if len(results) >= max_results:
+                    break
+        return results
+
+    def status(self):
+        loaded = self._load()
+        if loaded is None:
+            return {"built": False, "building": self._building}
+        meta = dict(loaded["meta"])
+        meta.update(built=True, building=self._building,
+                    stale=self.file_index.changed_at > meta["built_at"],
+                    size_mb=round(meta["count"] * meta["dim"] * 4 / (1024 * 1024), 2))
+        return meta
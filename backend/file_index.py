@@ -0,0 +1,644 @@
+import datetime
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from trigram_index import TrigramIndex
+
+SCHEMA_VERSION = 3
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".filewise", "file_index.db")
+INSERT_BATCH_SIZE = 5000
+SQL_VARIABLE_CHUNK = 900
+# Sort keys accepted by FileIndex.find, mapped to their row position
+SORT_KEYS = {"size": 2, "modified": 3, "created": 4, "name": 5}
+
+
+def stat_columns(path, root, st):
+    """(size, mtime, ctime, ext, depth) as stored per entry; ctime is creation time where the OS has it"""
+    depth = path[len(root.rstrip(os.sep)):].count(os.sep)
+    ext = os.path.splitext(path)[1].lower()
+    if st is None:
+        return None, None, None, ext, depth
+    created = getattr(st, "st_birthtime", st.st_ctime)
+    return st.st_size, st.st_mtime, created, ext, depth
+
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+              "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+AGE_UNITS = {"m": 60, "min": 60, "minute": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400,
+             "w": 604800, "week": 604800, "month": 2592000, "y": 31536000, "year": 31536000}
+
+
+def parse_size(value):
+    """Bytes from 2048, "500KB", "1.5 gb" or "10M" (binary units)"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-z]*)\s*", str(value).lower())
+    if not match or match.group(2) not in SIZE_UNITS:
+        raise ValueError(f"Unrecognised size '{value}'")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def parse_time(value, now=None):
+    """Epoch seconds from a timestamp, an ISO date, today, yesterday or an age such as 7d or 2 weeks"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    now = time.time() if now is None else now
+    text = str(value).strip().lower()
+    midnight = datetime.datetime.combine(datetime.date.fromtimestamp(now), datetime.time()).timestamp()
+    if text == "today":
+        return midnight
+    if text == "yesterday":
+        return midnight - 86400
+    match = re.fullmatch(r"([\d.]+)\s*([a-z]+?)s?(\s+ago)?", text)
+    if match and match.group(2) in AGE_UNITS:
+        return now - float(match.group(1)) * AGE_UNITS[match.group(2)]
+    try:
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Unrecognised date '{value}'")
+
+
+def _lstat(path):
+    try:
+        return os.lstat(path)
+    except OSError:
+        return None
+
+
+class FileIndex:
+    """Persistent SQLite filename index with trigram full-text lookups"""
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH, walker=None, ignore_provider=None):
+        self.db_path = db_path
+        self.walker = walker
+        # Callable root -> IgnoreRules; ignored subtrees are never indexed
+        self.ignore_provider = ignore_provider
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Let INSERT OR REPLACE fire the delete trigger so the FTS table stays in sync
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._create_schema()
+        self._roots_cache = None
+        # When entries were last added or removed; derived indexes compare their build time to it
+        self.changed_at = max((r["built_at"] or 0 for r in self.roots()), default=0.0)
+        # In-memory trigram index, loaded in the background; FTS5 answers until it is ready
+        self._memory_index = None
+        self._memory_generation = 0
+        self._pending_memory_ops = []
+        self.load_memory_index()
+
+    def _create_schema(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # The index is a cache of the disk, so an old layout is simply dropped
+                self._conn.executescript("""
+                    DROP TABLE IF EXISTS names;
+                    DROP TABLE IF EXISTS entries;
+                    DROP TABLE IF EXISTS roots;
+                """)
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS roots (
+                    root TEXT PRIMARY KEY,
+                    built_at REAL,
+                    entry_count INTEGER,
+                    build_seconds REAL
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL UNIQUE,
+                    parent TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    ctime REAL,
+                    ext TEXT,
+                    depth INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS entries_root ON entries(root);
+                CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent);
+                CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(
+                    name, content='entries', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO names(rowid, name) VALUES (new.id, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO names(names, rowid, name) VALUES ('delete', old.id, old.name);
+                END;
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+            self._conn.commit()
+
+    # -------------------- BUILDING --------------------
+
+    def _ignore_rules(self, root):
+        return self.ignore_provider(root) if self.ignore_provider else None
+
+    def _scan(self, root, rules=None):
+        """Yield (path, name, is_dir, stat) for everything under root that the rules do not ignore"""
+        ignore = rules.walker_filter() if rules else None
+        if self.walker is not None:
+            for entry in self.walker.walk(root, with_stat=True, ignore=ignore):
+                yield entry.path, entry.name, entry.is_dir, entry.stat
+            return
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if ignore is not None and ignore(entry.path, entry.name, is_dir):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        yield entry.path, entry.name, is_dir, st
+                        if is_dir:
+                            stack.append(entry.path)
+            except (PermissionError, FileNotFoundError, NotADirectoryError, OSError):
+                continue
+
+    def build(self, root):
+        """Index every file and folder under root, replacing any previous index of it"""
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            return {"error": f"Index root does not exist: {root}"}
+
+        started = time.time()
+        count = 0
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._delete_root(root)
+                batch = []
+                for path, name, is_dir, st in self._scan(root, self._ignore_rules(root)):
+                    batch.append((root, path, os.path.dirname(path), name, int(is_dir)) + stat_columns(path, root, st))
+                    if len(batch) >= INSERT_BATCH_SIZE:
+                        self._insert_batch(batch)
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    self._insert_batch(batch)
+                    count += len(batch)
+                elapsed = time.time() - started
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO roots(root, built_at, entry_count, build_seconds) VALUES (?, ?, ?, ?)",
+                    (root, time.time(), count, elapsed),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._roots_cache = None
+            self.changed_at = time.time()
+        self.load_memory_index()
+
+        return {
+            "message": f"Indexed {count} items under '{root}'",
+            "root": root,
+            "entry_count": count,
+            "build_seconds": round(elapsed, 2),
+        }
+
+    def _insert_batch(self, batch):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries(root, path, parent, name, is_dir, size, mtime, ctime, ext, depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+    def _delete_root(self, root):
+        self._conn.execute("DELETE FROM entries WHERE root = ?", (root,))
+        self._conn.execute("DELETE FROM roots WHERE root = ?", (root,))
+
+    def drop(self, root):
+        """Remove a root and all of its entries from the index"""
+        root = os.path.abspath(root)
+        with self._lock:
+            self._delete_root(root)
+            self._conn.commit()
+            self._roots_cache = None
+            self.changed_at = time.time()
+        self.load_memory_index()
+
+    # -------------------- INCREMENTAL UPDATES --------------------
+
+    def add_path(self, path):
+        """Index a newly created file or folder (and a folder's contents) without a rebuild"""
+        path = os.path.abspath(path)
+        root = self.covering_root(path)
+        if not root or os.path.normcase(path) == os.path.normcase(root) or not os.path.exists(path):
+            return 0
+        rules = self._ignore_rules(root)
+        if rules and rules.is_path_ignored(path):
+            return 0
+
+        items = [(path, os.path.basename(path), os.path.isdir(path), _lstat(path))]
+        if items[0][2]:
+            items.extend(self._scan(path, rules))
+        # makedirs/copy can create intermediate folders that were never reported
+        parent = os.path.dirname(path)
+        while os.path.normcase(parent) != os.path.normcase(root) and parent != os.path.dirname(parent):
+            items.insert(0, (parent, os.path.basename(parent), True, _lstat(parent)))
+            parent = os.path.dirname(parent)
+
+        added = 0
+        with self._lock:
+            for item_path, name, is_dir, st in items:
+                columns = stat_columns(item_path, root, st)
+                if self._conn.execute("SELECT 1 FROM entries WHERE path = ?", (item_path,)).fetchone():
+                    # Re-created or overwritten in place: only the stat columns are stale
+                    self._conn.execute(
+                        "UPDATE entries SET size = ?, mtime = ?, ctime = ?, ext = ?, depth = ? WHERE path = ?",
+                        columns + (item_path,),
+                    )
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT INTO entries(root, path, parent, name, is_dir, size, mtime, ctime, ext, depth) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (root, item_path, os.path.dirname(item_path), name, int(is_dir)) + columns,
+                )
+                self._memory_add(cursor.lastrowid, name, is_dir)
+                added += 1
+            self._conn.execute("UPDATE roots SET entry_count = entry_count + ? WHERE root = ?", (added, root))
+            self._conn.commit()
+            if added:
+                self.changed_at = time.time()
+        return added
+
+    def remove_path(self, path):
+        """Drop a deleted file or folder (and everything below it) from the index"""
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, root FROM entries WHERE path = ? OR substr(path, 1, ?) = ?",
+                (path, len(prefix), prefix),
+            ).fetchall()
+            if not rows:
+                return 0
+            removed_per_root = {}
+            for start in range(0, len(rows), SQL_VARIABLE_CHUNK):
+                chunk = [r[0] for r in rows[start:start + SQL_VARIABLE_CHUNK]]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(f"DELETE FROM entries WHERE id IN ({placeholders})", chunk)
+            for entry_id, root in rows:
+                removed_per_root[root] = removed_per_root.get(root, 0) + 1
+                self._memory_remove(entry_id)
+            for root, removed in removed_per_root.items():
+                self._conn.execute("UPDATE roots SET entry_count = entry_count - ? WHERE root = ?", (removed, root))
+            self._conn.commit()
+            self.changed_at = time.time()
+        return len(rows)
+
+    def update_stat(self, path):
+        """Refresh the stored size and times of one modified entry; False when nothing changed"""
+        path = os.path.abspath(path)
+        st = _lstat(path)
+        if st is None:
+            return False
+        size, mtime, ctime = stat_columns(path, path, st)[:3]
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE entries SET size = ?, mtime = ?, ctime = ? "
+                "WHERE path = ? AND (size IS NOT ? OR mtime IS NOT ? OR ctime IS NOT ?)",
+                (size, mtime, ctime, path, size, mtime, ctime),
+            )
+            # Skip the commit for a no-op: on a WAL database it would be a write of its own
+            if cursor.rowcount:
+                self._conn.commit()
+        return cursor.rowcount > 0
+
+    def move_path(self, source, destination):
+        """Apply a rename or move as a remove of the old subtree plus an add of the new one"""
+        removed = self.remove_path(source)
+        added = self.add_path(destination)
+        return removed, added
+
+    def children(self, directory):
+        """Return {name: is_dir} for the indexed direct children of directory"""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, is_dir FROM entries WHERE parent = ?", (directory,)
+            ).fetchall()
+        return {name: bool(is_dir) for name, is_dir in rows}
+
+    def directories(self, root):
+        """Return every indexed folder under root, root included"""
+        root = self._stored_path(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM entries WHERE is_dir = 1 AND substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+        return [root] + [r[0] for r in rows]
+
+    # -------------------- MEMORY INDEX --------------------
+
+    def load_memory_index(self, background=True):
+        """(Re)load the in-memory trigram index from the database"""
+        with self._lock:
+            self._memory_generation += 1
+            generation = self._memory_generation
+            self._memory_index = None
+            self._pending_memory_ops = []
+        if self.db_path == ":memory:":
+            # A private in-memory database cannot be opened from a second connection
+            background = False
+        if background:
+            threading.Thread(target=self._load_memory_index, args=(generation,), daemon=True).start()
+        else:
+            self._load_memory_index(generation)
+
+    def _load_memory_index(self, generation):
+        index = TrigramIndex()
+        if self.db_path == ":memory:":
+            with self._lock:
+                rows = self._conn.execute("SELECT id, name, is_dir FROM entries").fetchall()
+            for entry_id, name, is_dir in rows:
+                index.add(entry_id, name, is_dir)
+        else:
+            # A separate connection lets searches keep using FTS5 while this runs
+            conn = sqlite3.connect(self.db_path)
+            try:
+                for entry_id, name, is_dir in conn.execute("SELECT id, name, is_dir FROM entries ORDER BY id"):
+                    index.add(entry_id, name, is_dir)
+            finally:
+                conn.close()
+        with self._lock:
+            if generation == self._memory_generation:
+                # Replay incremental updates that landed while the snapshot was being read
+                for op in self._pending_memory_ops:
+                    if op[0] == "add":
+                        index.add(*op[1:])
+                    else:
+                        index.remove(op[1])
+                self._pending_memory_ops = []
+                self._memory_index = index
+
+    def _memory_add(self, entry_id, name, is_dir):
+        if self._memory_index is not None:
+            self._memory_index.add(entry_id, name, is_dir)
+        else:
+            self._pending_memory_ops.append(("add", entry_id, name, is_dir))
+
+    def _memory_remove(self, entry_id):
+        if self._memory_index is not None:
+            self._memory_index.remove(entry_id)
+        else:
+            self._pending_memory_ops.append(("remove", entry_id))
+
+    def _memory_rows(self, index, keyword, prefix, search_type, within=None):
+        ids = index.query(keyword, search_type, within)
+        for start in range(0, len(ids), SQL_VARIABLE_CHUNK):
+            chunk = ids[start:start + SQL_VARIABLE_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            yield from self._conn.execute(
+                f"SELECT path, is_dir FROM entries WHERE id IN ({placeholders}) AND substr(path, 1, ?) = ?",
+                chunk + [len(prefix), prefix],
+            )
+
+    def _collect(self, rows, prefix, max_results=None, max_depth=None):
+        """Bucket (path, is_dir) rows, stopping once max_results is reached"""
+        results = {"files": [], "folders": [], "truncated": False}
+        found = 0
+        for path, is_dir in rows:
+            if max_depth is not None and path[len(prefix):].count(os.sep) + 1 > max_depth:
+                continue
+            if max_results is not None and found >= max_results:
+                results["truncated"] = True
+                break
+            results["folders" if is_dir else "files"].append(path)
+            found += 1
+        return results
+
+    def iter_entries(self, batch_size=INSERT_BATCH_SIZE):
+        """Yield lists of (id, path, name, is_dir) rows from a private connection"""
+        if self.db_path == ":memory:":
+            with self._lock:
+                rows = self._conn.execute("SELECT id, path, name, is_dir FROM entries ORDER BY id").fetchall()
+            for start in range(0, len(rows), batch_size):
+                yield rows[start:start + batch_size]
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute("SELECT id, path, name, is_dir FROM entries ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def indexed_paths(self, paths):
+        """The subset of paths that are still indexed"""
+        found = set()
+        paths = list(paths)
+        with self._lock:
+            for start in range(0, len(paths), SQL_VARIABLE_CHUNK):
+                chunk = paths[start:start + SQL_VARIABLE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT path FROM entries WHERE path IN ({placeholders})", chunk
+                ))
+        return found
+
+    # -------------------- QUERYING --------------------
+
+    def roots(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT root, built_at, entry_count, build_seconds FROM roots ORDER BY root"
+            ).fetchall()
+        return [
+            {"root": r[0], "built_at": r[1], "entry_count": r[2], "build_seconds": r[3]}
+            for r in rows
+        ]
+
+    def root_paths(self):
+        with self._lock:
+            if self._roots_cache is None:
+                self._roots_cache = [
+                    r[0] for r in self._conn.execute("SELECT root FROM roots").fetchall()
+                ]
+            return list(self._roots_cache)
+
+    def _ids_under(self, prefix):
+        """Ids of every entry whose path starts with prefix, read as a range of the path index"""
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return {row[0] for row in self._conn.execute(
+            "SELECT id FROM entries WHERE path >= ? AND path < ?", (prefix, upper)
+        )}
+
+    def _stored_path(self, path):
+        """path spelled the way the index stores it
+
+        covering_root() compares normcase'd paths, so on a case-insensitive
+        platform a differently cased path counts as indexed; the prefix
+        comparisons in SQL are exact, so the caller's casing is replaced with
+        the stored one, folder by folder below the root.
+        """
+        path = os.path.abspath(path)
+        root = self.covering_root(path)
+        if root is None:
+            return path
+        with self._lock:
+            if path == root or self._conn.execute("SELECT 1 FROM entries WHERE path = ?", (path,)).fetchone():
+                return path
+        parts = [part for part in path[len(root):].split(os.sep) if part]
+        stored = root
+        for depth, part in enumerate(parts):
+            wanted = os.path.normcase(part)
+            name = next((n for n in self.children(stored) if os.path.normcase(n) == wanted), None)
+            if name is None:
+                # Not indexed below here; nothing to match the rest against
+                return os.path.join(stored, *parts[depth:])
+            stored = os.path.join(stored, name)
+        return stored
+
+    def covering_root(self, path):
+        """Return the indexed root that contains path, or None"""
+        path = os.path.normcase(os.path.abspath(path))
+        best = None
+        for indexed_root in self.root_paths():
+            root = os.path.normcase(indexed_root)
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                if best is None or len(indexed_root) > len(best):
+                    best = indexed_root
+        return best
+
+    def search(self, keyword, search_path, search_type="both", max_results=None, max_depth=None):
+        """Case-insensitive substring match on names under search_path
+
+        max_depth counts levels below search_path (1 = direct children only); the
+        result carries truncated=True when max_results cut the match list short.
+        """
+        search_path = self._stored_path(search_path)
+        keyword = keyword.lower()
+        prefix = search_path.rstrip(os.sep) + os.sep
+        below_root = search_path not in self.root_paths()
+
+        with self._lock:
+            if self._memory_index is not None:
+                # A folder below a root is narrowed to its own entries before any name is compared
+                within = self._ids_under(prefix) if below_root else None
+                rows = self._memory_rows(self._memory_index, keyword, prefix, search_type, within)
+                return self._collect(rows, prefix, max_results, max_depth)
+
+        if len(keyword) >= 3:
+            # Trigram MATCH on a quoted phrase is a pure substring lookup
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            sql = (
+                "SELECT e.path, e.is_dir FROM names JOIN entries e ON e.id = names.rowid "
+                "WHERE names MATCH ? AND substr(e.path, 1, ?) = ?"
+            )
+            args = [phrase, len(prefix), prefix]
+        else:
+            # Too short for trigrams, fall back to a scan of the names column
+            sql = "SELECT e.path, e.is_dir FROM entries e WHERE instr(lower(e.name), ?) > 0 AND substr(e.path, 1, ?) = ?"
+            args = [keyword, len(prefix), prefix]
+
+        if search_type == "file":
+            sql += " AND e.is_dir = 0"
+        elif search_type == "folder":
+            sql += " AND e.is_dir = 1"
+
+        with self._lock:
+            return self._collect(self._conn.execute(sql, args), prefix, max_results, max_depth)
+
+    def find(self, search_path, search_type="file", min_size=None, max_size=None,
+             modified_after=None, modified_before=None, created_after=None, created_before=None,
+             extensions=None, max_depth=None, name_contains=None, sort_by=None, descending=True, limit=50):
+        """Metadata query over the stored stat columns; the disk is never touched
+
+        Sizes are bytes, times are epoch seconds and max_depth counts levels below
+        search_path. With sort_by ("size", "modified", "created" or "name") the top
+        `limit` rows are kept in a heap while the matches stream past, so the full
+        match list is never built. Returns (rows, total_matches) where each row is
+        (path, is_dir, size, mtime, ctime, name).
+        """
+        search_path = self._stored_path(search_path)
+        prefix = search_path.rstrip(os.sep) + os.sep
+        sql = (
+            "SELECT path, is_dir, size, mtime, ctime, name FROM entries "
+            "WHERE substr(path, 1, ?) = ?"
+        )
+        args = [len(prefix), prefix]
+        if search_type == "file":
+            sql += " AND is_dir = 0"
+        elif search_type == "folder":
+            sql += " AND is_dir = 1"
+        for column, op, value in (
+            ("size", ">=", min_size), ("size", "<=", max_size),
+            ("mtime", ">=", modified_after), ("mtime", "<=", modified_before),
+            ("ctime", ">=", created_after), ("ctime", "<=", created_before),
+        ):
+            if value is not None:
+                sql += f" AND {column} {op} ?"
+                args.append(value)
+        if extensions:
+            extensions = ["." + e.lower().lstrip(".") for e in extensions]
+            sql += f" AND ext IN ({','.join('?' * len(extensions))})"
+            args.extend(extensions)
+        if max_depth is not None:
+            root = self.covering_root(search_path) or search_path
+            base = stat_columns(search_path, root, None)[4]
+            sql += " AND depth <= ?"
+            args.append(base + int(max_depth))
+        if name_contains:
+            sql += " AND instr(lower(name), ?) > 0"
+            args.append(name_contains.lower())
+
+        with self._lock:
+            cursor = self._conn.execute(sql, args)
+            if sort_by is None:
+                rows = cursor.fetchmany(limit) if limit else cursor.fetchall()
+                total = len(rows) + sum(1 for _ in cursor)
+                return rows, total
+
+            position = SORT_KEYS[sort_by]
+            counted = [0]
+
+            def matches():
+                for row in cursor:
+                    counted[0] += 1
+                    if row[position] is not None:
+                        yield row
+
+            # heapq.nlargest/nsmallest keep only `limit` rows alive at any time
+            key = (lambda row: row[position].lower()) if sort_by == "name" else (lambda row: row[position])
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            rows = pick(limit, matches(), key=key) if limit else sorted(matches(), key=key, reverse=descending)
+            return rows, counted[0]
+
+    def status(self):
+        roots = self.roots()
+        db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {
+            "index_path": self.db_path,
+            "roots": roots,
+            "total_entries": sum(r["entry_count"] or 0 for r in roots),
+            "index_size_mb": round(db_size / (1024 * 1024), 2),
+            "memory_index_loaded": self._memory_index is not None,
+            "memory_index_mb": round(self._memory_index.memory_bytes() / (1024 * 1024), 2) if self._memory_index else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
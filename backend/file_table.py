@@ -0,0 +1,93 @@
+import os
+import sys
+from array import array
+
+
+class FileTable:
+    """Columnar, read-only table of file paths
+
+    A path is stored as a folder id, a slice of one shared string buffer holding
+    every name without its extension, and an extension id. Folders and
+    extensions are interned, so 100k hits in a few folders cost a couple of
+    integers plus the stem characters per file instead of four strings and a
+    dict. Row accessors build strings on demand; info() builds the old
+    file-info dict for the few rows that are actually returned.
+    """
+
+    __slots__ = ("_folders", "_exts", "_folder_ids", "_ext_ids", "_offsets", "_stems")
+
+    def __init__(self, paths=()):
+        folders, folder_ids = [], {}
+        exts, ext_ids = [], {}
+        self._folder_ids = array("I")
+        self._ext_ids = array("I")
+        self._offsets = array("I", [0])
+        stems = []
+        length = 0
+        for path in paths:
+            name = os.path.basename(path)
+            stem, ext = os.path.splitext(name)
+            # Keep the exact prefix (separator included) so path() round-trips
+            folder = path[:len(path) - len(name)]
+            fid = folder_ids.get(folder)
+            if fid is None:
+                fid = folder_ids[folder] = len(folders)
+                folders.append(folder)
+            eid = ext_ids.get(ext)
+            if eid is None:
+                eid = ext_ids[ext] = len(exts)
+                exts.append(ext)
+            self._folder_ids.append(fid)
+            self._ext_ids.append(eid)
+            stems.append(stem)
+            length += len(stem)
+            self._offsets.append(length)
+        self._folders = folders
+        self._exts = exts
+        self._stems = "".join(stems)
+
+    def __len__(self):
+        return len(self._folder_ids)
+
+    def __sizeof__(self):
+        return (
+            object.__sizeof__(self)
+            + sys.getsizeof(self._stems)
+            + sum(sys.getsizeof(a) for a in (self._folder_ids, self._ext_ids, self._offsets))
+            + sum(sys.getsizeof(s) for s in self._folders) + sys.getsizeof(self._folders)
+            + sum(sys.getsizeof(s) for s in self._exts) + sys.getsizeof(self._exts)
+        )
+
+    # -------------------- ROWS --------------------
+
+    def stem(self, row):
+        return self._stems[self._offsets[row]:self._offsets[row + 1]]
+
+    def name(self, row):
+        return self.stem(row) + self._exts[self._ext_ids[row]]
+
+    def path(self, row):
+        return self._folders[self._folder_ids[row]] + self.name(row)
+
+    def folder(self, row):
+        return os.path.dirname(self.path(row))
+
+    def info(self, row):
+        """The {path, name, name_without_ext, folder} dict callers used to cache per file"""
+        path = self.path(row)
+        return {
+            "path": path,
+            "name": os.path.basename(path),
+            "name_without_ext": self.stem(row),
+            "folder": os.path.dirname(path),
+        }
+
+    # -------------------- COLUMNS --------------------
+
+    def paths(self):
+        for row in range(len(self)):
+            yield self.path(row)
+
+    def stems(self):
+        for row in range(len(self)):
+            yield self.stem(row)
@@ -0,0 +1,339 @@
+import os
+import queue
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+DEFAULT_POLL_INTERVAL = 5.0
+# Where the file index, content index, embeddings and memory journal live
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".filewise")
+
+
+class _IndexEventHandler(FileSystemEventHandler):
+    """Forward watchdog events to the watcher queue"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        self.watcher.notify("created", event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify("modified", event.src_path)
+
+    def on_deleted(self, event):
+        self.watcher.notify("deleted", event.src_path)
+
+    def on_moved(self, event):
+        self.watcher.notify("moved", event.src_path, event.dest_path)
+
+
+class IndexWatcher:
+    """Keep a FileIndex current by applying create/move/delete events incrementally
+
+    Uses native change notifications through watchdog when it is installed and
+    falls back to polling directory mtimes otherwise. Every event is also passed
+    to on_change so other caches can drop or rewrite the affected paths. Polling
+    sees names only, except under roots watched with contents=True: those keep
+    a listing per folder, re-list only folders whose mtime moved and stat the
+    files of the rest, so edits ("modified") reach the content index without
+    watchdog too. Both skip what the file index's ignore rules skip. Events under ignore_dirs,
+    the agent's own state directory by default, are dropped: every commit to
+    the index database would otherwise come back as another change.
+    """
+
+    def __init__(self, file_index, on_change=None, poll_interval=DEFAULT_POLL_INTERVAL, use_watchdog=True,
+                 walker=None, ignore_dirs=(STATE_DIR,)):
+        self.file_index = file_index
+        self._ignore_prefixes = tuple(os.path.abspath(d).rstrip(os.sep) + os.sep for d in ignore_dirs)
+        self.on_change = on_change
+        self.walker = walker
+        self.poll_interval = poll_interval
+        self.mode = "watchdog" if (use_watchdog and WATCHDOG_AVAILABLE) else "polling"
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._roots = {}
+        self._dir_mtimes = {}
+        # Polling only, roots watched with contents=True:
+        # root -> {folder: [mtime_ns, {name: (is_dir, mtime_ns, size)}]}
+        self._walked = {}
+        self._observer = None
+        self._stop = threading.Event()
+        self._threads = []
+        self.events_applied = 0
+
+    # -------------------- LIFECYCLE --------------------
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        if self.mode == "watchdog":
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.start()
+            for root in list(self._roots):
+                self._schedule(root)
+        else:
+            self._threads.append(threading.Thread(target=self._poll_loop, daemon=True))
+        self._threads.append(threading.Thread(target=self._apply_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._events.put(None)
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        self._threads = []
+
+    def watch(self, root, contents=False):
+        """Start tracking changes below an indexed root; contents=True when file edits matter too"""
+        root = os.path.abspath(root)
+        walk = contents and self.mode == "polling" and self.walker is not None
+        with self._lock:
+            known = root in self._roots
+            if known and not (walk and root not in self._walked):
+                return
+            self._roots.setdefault(root, None)
+        if self.mode == "watchdog":
+            if self._observer is not None:
+                self._schedule(root)
+        elif walk:
+            snapshot = self._walk_snapshot(root, self._ignore_filter(root))
+            with self._lock:
+                self._walked[root] = snapshot
+                # The walk reports names too; directory mtimes below root would only repeat it
+                self._forget_dirs(root)
+        else:
+            self._snapshot_mtimes(root)
+
+    def unwatch(self, root):
+        root = os.path.abspath(root)
+        with self._lock:
+            watch = self._roots.pop(root, None)
+            self._walked.pop(root, None)
+            self._forget_dirs(root)
+        if watch is not None and self._observer is not None:
+            self._observer.unschedule(watch)
+
+    def _forget_dirs(self, root):
+        prefix = root.rstrip(os.sep) + os.sep
+        for directory in [d for d in self._dir_mtimes if d == root or d.startswith(prefix)]:
+            del self._dir_mtimes[directory]
+
+    def _schedule(self, root):
+        try:
+            watch = self._observer.schedule(_IndexEventHandler(self), root, recursive=True)
+            with self._lock:
+                self._roots[root] = watch
+        except OSError as e:
+            print(f"Could not watch '{root}': {e}")
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "running": bool(self._threads),
+            "watched_roots": sorted(self._roots),
+            "pending_events": self._events.qsize(),
+            "events_applied": self.events_applied,
+        }
+
+    # -------------------- EVENTS --------------------
+
+    def notify(self, kind, path, destination=None):
+        """Queue a change; the agent calls this directly after its own file operations"""
+        if self._ignored(path) and (not destination or self._ignored(destination)):
+            return
+        self._events.put((kind, os.path.abspath(path), os.path.abspath(destination) if destination else None))
+
+    def _ignored(self, path):
+        return (os.path.abspath(path) + os.sep).startswith(self._ignore_prefixes)
+
+    def _apply_loop(self):
+        while not self._stop.is_set():
+            event = self._events.get()
+            if event is None:
+                break
+            try:
+                self.apply(*event)
+            except Exception as e:
+                print(f"Index watcher failed to apply {event}: {e}")
+
+    def apply(self, kind, path, destination=None):
+        """Apply one change to the index and notify listeners"""
+        if kind == "moved" and self._ignored(path):
+            kind, path, destination = "created", destination, None
+        elif kind == "moved" and self._ignored(destination):
+            kind, destination = "deleted", None
+        if self._ignored(path):
+            return
+        if kind == "created":
+            self.file_index.add_path(path)
+            self._track_new_dirs(path)
+        elif kind == "deleted":
+            self.file_index.remove_path(path)
+        elif kind == "moved":
+            self.file_index.move_path(path, destination)
+            self._track_new_dirs(destination)
+        elif kind == "modified":
+            # Content changes only move the stored size and times
+            self.file_index.update_stat(path)
+        else:
+            return
+        self.events_applied += 1
+        if self.on_change:
+            self.on_change(kind, path, destination)
+
+    # -------------------- POLLING FALLBACK --------------------
+
+    def _snapshot_mtimes(self, root):
+        mtimes = {}
+        for directory in self.file_index.directories(root):
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+        with self._lock:
+            self._dir_mtimes.update(mtimes)
+
+    def _track_new_dirs(self, path):
+        if self.mode != "polling" or not path or not os.path.isdir(path) or self._walked_root(path):
+            return
+        self._snapshot_mtimes(path)
+
+    def _walked_root(self, path):
+        with self._lock:
+            return next((root for root in self._walked
+                         if path == root or path.startswith(root.rstrip(os.sep) + os.sep)), None)
+
+    def _ignore_filter(self, root):
+        provider = getattr(self.file_index, "ignore_provider", None)
+        rules = provider(root) if provider else None
+        return rules.walker_filter() if rules else None
+
+    def _walk_snapshot(self, directory, ignore):
+        """Listing of directory and every folder below it that ignore keeps"""
+        try:
+            snapshot = {directory: [os.stat(directory).st_mtime_ns, {}]}
+        except OSError:
+            return {}
+        for entry in self.walker.walk(directory, with_stat=True, ignore=ignore):
+            # Workers run in parallel, so a folder's children may arrive before the folder itself
+            parent = snapshot.setdefault(os.path.dirname(entry.path), [None, {}])
+            parent[1][entry.name] = (entry.is_dir, entry.stat.st_mtime_ns, entry.stat.st_size)
+            if entry.is_dir:
+                snapshot.setdefault(entry.path, [None, {}])[0] = entry.stat.st_mtime_ns
+        return snapshot
+
+    @staticmethod
+    def _list_directory(directory, ignore):
+        listing = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if ignore is not None and ignore(entry.path, entry.name, is_dir):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    listing[entry.name] = (is_dir, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+        return listing
+
+    @staticmethod
+    def _restat(directory, children):
+        """children with fresh file times and sizes; the folder's unchanged mtime vouches for the names"""
+        listing = {}
+        for name, before in children.items():
+            if before[0]:
+                listing[name] = before
+                continue
+            try:
+                st = os.stat(os.path.join(directory, name), follow_symlinks=False)
+            except OSError:
+                # Just removed; the folder's mtime reports it next poll
+                listing[name] = before
+                continue
+            listing[name] = (False, st.st_mtime_ns, st.st_size)
+        return listing
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll_once()
+
+    def poll_once(self):
+        """Diff every directory whose mtime moved against its indexed children, and re-walk content roots"""
+        with self._lock:
+            tracked = list(self._dir_mtimes.items())
+            walked = list(self._walked.items())
+        for root, old in walked:
+            self._diff_walk(root, old)
+        for directory, old_mtime in tracked:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Gone; the parent's mtime change reports the deletion
+                with self._lock:
+                    self._dir_mtimes.pop(directory, None)
+                continue
+            if mtime == old_mtime:
+                continue
+            with self._lock:
+                self._dir_mtimes[directory] = mtime
+            self._diff_directory(directory)
+
+    def _diff_walk(self, root, old):
+        ignore = self._ignore_filter(root)
+        new = {}
+        for directory, (old_mtime, children) in old.items():
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Gone; the parent's listing reports the deletion
+                continue
+            if mtime == old_mtime:
+                listing = self._restat(directory, children)
+            else:
+                listing = self._list_directory(directory, ignore)
+                if listing is None:
+                    continue
+                # Only the topmost new or removed path is reported; events cover everything below it
+                for name in listing.keys() - children.keys():
+                    path = os.path.join(directory, name)
+                    self.notify("created", path)
+                    if listing[name][0]:
+                        new.update(self._walk_snapshot(path, ignore))
+                for name in children.keys() - listing.keys():
+                    self.notify("deleted", os.path.join(directory, name))
+            for name, (is_dir, file_mtime, size) in listing.items():
+                before = children.get(name)
+                if before is not None and not is_dir and not before[0] and before[1:] != (file_mtime, size):
+                    self.notify("modified", os.path.join(directory, name))
+            new[directory] = [mtime, listing]
+        with self._lock:
+            if root in self._walked:
+                self._walked[root] = new
+
+    def _diff_directory(self, directory):
+        indexed = self.file_index.children(directory)
+        try:
+            on_disk = set(os.listdir(directory))
+        except OSError:
+            return
+        for name in on_disk - set(indexed):
+            self.notify("created", os.path.join(directory, name))
+        for name in set(indexed) - on_disk:
+            self.notify("deleted", os.path.join(directory, name))
@@ -0,0 +1,213 @@
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+
+CHUNK_SIZE = 4 * 1024 * 1024
+SNIFF_BYTES = 8192
+SNIPPET_CHARS = 200
+# Files are shipped to worker processes in batches of roughly this many bytes
+BATCH_BYTES = 32 * 1024 * 1024
+BATCH_FILES = 256
+# Below this many candidate files or bytes a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+DEFAULT_PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+
+
+@lru_cache(maxsize=64)
+def _compile(pattern, is_regex, case_sensitive, text=False):
+    raw = pattern if text else pattern.encode("utf-8")
+    if not is_regex:
+        raw = re.escape(raw)
+    # A chunk holds many lines; ^ and $ anchor to each of them
+    return re.compile(raw, re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+
+
+def _find_all(chunk, pattern, is_regex, case_sensitive):
+    """Yield (start, end) of matches in chunk, a bytes or, for Unicode case folding, a str
+
+    Literal patterns on bytes use bytes.find on a lowercased copy of the chunk,
+    which is several times faster than an IGNORECASE regex over the same bytes.
+    """
+    text = isinstance(chunk, str)
+    if is_regex or text:
+        for match in _compile(pattern, is_regex, case_sensitive, text).finditer(chunk):
+            yield match.start(), match.end()
+        return
+    needle = pattern.encode("utf-8")
+    haystack = chunk
+    if not case_sensitive:
+        needle, haystack = needle.lower(), chunk.lower()
+    position = haystack.find(needle)
+    while position != -1:
+        yield position, position + len(needle)
+        position = haystack.find(needle, position + 1)
+
+
+def is_binary(path):
+    """Sniff the header the way grep does: a NUL byte means binary"""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(SNIFF_BYTES)
+    except OSError:
+        return True
+
+
+def grep_file(path, pattern, is_regex=False, case_sensitive=False, max_matches=None):
+    """Return [(line_number, line_text)] for lines of path matching pattern
+
+    The file is memory-mapped and scanned in CHUNK_SIZE pieces cut at line
+    boundaries, so no match straddles a chunk and memory stays flat however
+    large the file is. Only the first match on each line is reported. Chunks
+    are searched as bytes, whose case folding covers ASCII only, so a
+    case-insensitive pattern with other letters ("Über") decodes each chunk
+    and searches it as text instead.
+    """
+    fold_unicode = not case_sensitive and not pattern.isascii()
+    newline = "\n" if fold_unicode else b"\n"
+    matches = []
+    try:
+        size = os.path.getsize(path)
+        if size == 0 or is_binary(path):
+            return matches
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            line_number = 1
+            while start < size:
+                end = min(start + CHUNK_SIZE, size)
+                if end < size:
+                    newline = mm.find(b"\n", end)
+                    end = size if newline == -1 else newline + 1
+                chunk = mm[start:end]
+                if fold_unicode:
+                    # Chunks end on a line break, so no character is cut in two
+                    chunk = chunk.decode("utf-8", errors="replace")
+                counted_to = 0
+                next_line_start = 0
+                for match_start, match_end in _find_all(chunk, pattern, is_regex, case_sensitive):
+                    if match_start < next_line_start:
+                        continue
+                    line_number += chunk.count(newline, counted_to, match_start)
+                    counted_to = match_start
+                    line_start = chunk.rfind(newline, 0, match_start) + 1
+                    line_end = chunk.find(newline, match_end)
+                    if line_end == -1:
+                        line_end = len(chunk)
+                    text = chunk[line_start:line_end]
+                    if not fold_unicode:
+                        text = text.decode("utf-8", errors="replace")
+                    text = text.strip()
+                    matches.append((line_number, text[:SNIPPET_CHARS]))
+                    if max_matches and len(matches) >= max_matches:
+                        return matches
+                    next_line_start = line_end + 1
+                line_number += chunk.count(newline, counted_to)
+                start = end
+    except (OSError, ValueError):
+        pass
+    return matches
+
+
+def _grep_batch(paths, pattern, is_regex, case_sensitive, max_per_file):
+    """Worker entry point: grep several files and return (path, line, snippet) records"""
+    records = []
+    for path in paths:
+        for line_number, text in grep_file(path, pattern, is_regex, case_sensitive, max_per_file):
+            records.append((path, line_number, text))
+    return records
+
+
+class GrepEngine:
+    """Ad-hoc content search: walker-fed file batches grepped across a process pool"""
+
+    def __init__(self, walker, processes=DEFAULT_PROCESSES):
+        self.walker = walker
+        self.processes = max(1, int(processes))
+        self._pool = None
+
+    def _get_pool(self):
+        # Created lazily and kept, since process start-up dominates small searches. Spawned,
+        # not forked: a fork of this threaded server can inherit a lock some other thread held
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _batches(self, root, include, ignore):
+        batch, batch_bytes = [], 0
+        for entry in self.walker.walk(root, with_stat=True, ignore=ignore):
+            if entry.is_dir or not entry.stat.st_size:
+                continue
+            if include and not any(fnmatch.fnmatch(entry.name.lower(), p.lower()) for p in include):
+                continue
+            batch.append(entry.path)
+            batch_bytes += entry.stat.st_size
+            if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+                yield batch, batch_bytes
+                batch, batch_bytes = [], 0
+        if batch:
+            yield batch, batch_bytes
+
+    def grep(self, pattern, root, is_regex=False, case_sensitive=False, max_results=200,
+             include=None, ignore=None, max_per_file=None):
+        """Search file contents under root; returns (records, truncated)"""
+        if is_regex:
+            _compile(pattern, is_regex, case_sensitive)  # surface bad regexes before walking
+        args = (pattern, is_regex, case_sensitive, max_per_file)
+        records = []
+
+        batches = self._batches(root, include, ignore)
+        first = []
+        first_files = first_bytes = 0
+        for batch, batch_bytes in batches:
+            first.append(batch)
+            first_files += len(batch)
+            first_bytes += batch_bytes
+            if first_files >= PARALLEL_MIN_FILES or first_bytes >= PARALLEL_MIN_BYTES:
+                break
+        else:
+            # Small job: grep in this process
+            for batch in first:
+                records.extend(_grep_batch(batch, *args))
+                if max_results and len(records) >= max_results:
+                    return records[:max_results], True
+            return records, False
+
+        pool = self._get_pool()
+        pending = {pool.submit(_grep_batch, batch, *args) for batch in first}
+        truncated = False
+        try:
+            for batch, _ in batches:
+                # Keep a bounded number of batches in flight while the walk continues
+                while len(pending) >= self.processes * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        records.extend(future.result())
+                    if max_results and len(records) >= max_results:
+                        truncated = True
+                        break
+                if truncated:
+                    break
+                pending.add(pool.submit(_grep_batch, batch, *args))
+            if not truncated:
+                for future in pending:
+                    records.extend(future.result())
+                pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+            batches.close()
+
+        if max_results and len(records) > max_results:
+            records, truncated = records[:max_results], True
+        return records, truncated
@@ -0,0 +1,191 @@
+import fnmatch
+import json
+import os
+import re
+import threading
+
+IGNORE_FILE_NAME = ".filewiseignore"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".filewise", "ignore_rules.json")
+
+# Heavy or system folders that are almost never what a user is searching for
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/",
+    ".svn/",
+    ".hg/",
+    "node_modules/",
+    "__pycache__/",
+    ".venv/",
+    "venv/",
+    ".tox/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ipynb_checkpoints/",
+    "site-packages/",
+    "AppData/",
+    "$Recycle.Bin/",
+    "System Volume Information/",
+    "$WinREAgent/",
+    "*.pyc",
+    # FileWise's own indexes and journal; their writes would otherwise feed back into the watcher
+    ".filewise/",
+]
+
+
+class _Rule:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to the rule root, as in .gitignore
+        self.anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if pattern.startswith("**/"):
+            pattern = pattern[3:]
+            self.anchored = "/" in pattern
+        self.literal = not any(ch in pattern for ch in "*?[")
+        self.name = pattern.lower()
+        self.regex = re.compile(fnmatch.translate(pattern.replace("**/", "*/")), re.IGNORECASE)
+
+    def matches(self, rel_path, name, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if self.anchored:
+            return bool(self.regex.match(rel_path))
+        if self.literal:
+            return name.lower() == self.name
+        return bool(self.regex.match(name))
+
+
+class IgnoreRules:
+    """Compiled gitignore-style rules for one search root
+
+    Plain names such as "node_modules/" go into a set lookup and the remaining
+    unanchored globs are merged into one regex, so the common case costs a
+    lowercase and a hash probe per entry. Negated ("!") rules fall back to
+    ordered last-match-wins evaluation.
+    """
+
+    def __init__(self, root, patterns):
+        self.root = os.path.abspath(root)
+        self.patterns = [p.strip() for p in patterns if p.strip() and not p.strip().startswith("#")]
+        self._rules = [_Rule(p) for p in self.patterns]
+        self._ordered = any(rule.negate for rule in self._rules)
+
+        self._names = set()
+        self._dir_names = set()
+        self._anchored = []
+        globs, dir_globs = [], []
+        for rule in self._rules:
+            if rule.anchored:
+                self._anchored.append(rule)
+            elif rule.literal:
+                (self._dir_names if rule.dir_only else self._names).add(rule.name)
+            else:
+                (dir_globs if rule.dir_only else globs).append(rule.regex.pattern)
+        self._glob = re.compile("|".join(globs), re.IGNORECASE) if globs else None
+        self._dir_glob = re.compile("|".join(dir_globs), re.IGNORECASE) if dir_globs else None
+
+    def __bool__(self):
+        return bool(self._rules)
+
+    def _relative(self, path):
+        rel = path[len(self.root):].lstrip(os.sep)
+        return rel.replace(os.sep, "/")
+
+    def is_ignored(self, path, name, is_dir):
+        """True if this entry (and, for a folder, everything below it) should be skipped"""
+        if self._ordered:
+            rel_path = self._relative(path)
+            ignored = False
+            for rule in self._rules:
+                if rule.matches(rel_path, name, is_dir):
+                    ignored = not rule.negate
+            return ignored
+
+        lowered = name.lower()
+        if lowered in self._names or (is_dir and lowered in self._dir_names):
+            return True
+        if self._glob is not None and self._glob.match(name):
+            return True
+        if is_dir and self._dir_glob is not None and self._dir_glob.match(name):
+            return True
+        if self._anchored:
+            rel_path = self._relative(path)
+            return any(rule.matches(rel_path, name, is_dir) for rule in self._anchored)
+        return False
+
+    def is_path_ignored(self, path):
+        """Check path and every folder between it and the root, for single events"""
+        path = os.path.abspath(path)
+        if not path.startswith(self.root.rstrip(os.sep) + os.sep):
+            return False
+        current = self.root
+        parts = path[len(self.root):].strip(os.sep).split(os.sep)
+        for i, part in enumerate(parts):
+            current = os.path.join(current, part)
+            is_dir = i < len(parts) - 1 or os.path.isdir(current)
+            if self.is_ignored(current, part, is_dir):
+                return True
+        return False
+
+    def walker_filter(self):
+        """Adapter for ParallelWalker.walk(ignore=...)"""
+        return lambda path, name, is_dir: self.is_ignored(path, name, is_dir)
+
+
+class IgnoreConfig:
+    """Per-root ignore settings: built-in defaults, a .filewiseignore file and saved overrides"""
+
+    def __init__(self, config_path=DEFAULT_CONFIG_PATH):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._roots = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                self._roots = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._roots = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.config_path)), exist_ok=True)
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump(self._roots, f, indent=2)
+
+    def _settings_for(self, root):
+        """Settings of the closest configured root at or above root"""
+        root = os.path.normcase(os.path.abspath(root))
+        best, best_len = {}, -1
+        for configured, settings in self._roots.items():
+            key = os.path.normcase(configured)
+            if (root == key or root.startswith(key.rstrip(os.sep) + os.sep)) and len(key) > best_len:
+                best, best_len = settings, len(key)
+        return best
+
+    def patterns_for(self, root):
+        root = os.path.abspath(root)
+        with self._lock:
+            settings = self._settings_for(root)
+        patterns = list(DEFAULT_IGNORE_PATTERNS) if settings.get("use_defaults", True) else []
+        patterns.extend(settings.get("patterns", []))
+        try:
+            with open(os.path.join(root, IGNORE_FILE_NAME), "r", encoding="utf-8") as f:
+                patterns.extend(f.read().splitlines())
+        except OSError:
+            pass
+        return patterns
+
+    def rules_for(self, root):
+        return IgnoreRules(root, self.patterns_for(root))
+
+    def set_rules(self, root, patterns=None, use_defaults=True):
+        root = os.path.abspath(root)
+        with self._lock:
+            self._roots[root] = {"patterns": list(patterns or []), "use_defaults": bool(use_defaults)}
+            self._save()
+        return self.rules_for(root)
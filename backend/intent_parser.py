@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+
+# Commands below this confidence go to Gemini
+DEFAULT_THRESHOLD = 0.9
+
+# Wake words and politeness around a request; they never change what is asked
+_LEADING_FILLER = re.compile(
+    r"^(?:(?:hey|hi|ok|okay)\s+(?:filewise|jarvis)\b[\s,]*|(?:please|can you|could you|would you|will you)\s+)+", re.I
+)
+_TRAILING_FILLER = re.compile(r"(?:\s+(?:please|for me|right now|now))+$", re.I)
+
+_WINDOWS_PATH = r"[a-z]:[\\/]"
+
+
+def normalize(text):
+    """Collapse whitespace, drop closing punctuation and filler; case is kept for paths"""
+    text = " ".join(text.split()).rstrip(".?!").strip()
+    stripped = _TRAILING_FILLER.sub("", _LEADING_FILLER.sub("", text)).strip(" ,")
+    return stripped or text
+
+
+class IntentParser:
+    """Resolve unambiguous everyday requests to a command without calling Gemini
+
+    Each rule is a regular expression that must match the whole normalized
+    utterance, so anything with extra detail ("open the report I made
+    yesterday") falls through. A rule returns its command and a confidence;
+    only commands at or above threshold are used. Application names are
+    only trusted when they are in the agent's application table.
+    """
+
+    def __init__(self, applications=(), threshold=DEFAULT_THRESHOLD):
+        self.applications = {name.lower(): command for name, command in dict(applications).items()}
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.resolved = 0
+        self.deferred = 0
+        rules = [
+            (r"what(?:'s| is) the (?:current )?time|what time is it|(?:tell me |show me )?the (?:current )?time"
+             r"|current time|time", self._time),
+            (r"what(?:'s| is) (?:the )?(?:date|day)(?: today)?|what day is (?:it|today)|today's date"
+             r"|what(?:'s| is) today", self._time),
+            (r"(?:show |get |what(?:'s| is| are) )?(?:me )?(?:my |the )?(?:system|computer|pc|device)"
+             r" (?:info|information|specs|specifications|details|status)", self._system_info),
+            (r"(?:list|show)(?: me)?(?: all)?(?: the)? (?:running|open|active) (?:programs|apps|applications|processes)"
+             r"|what(?:'s| is) running|(?:which|what) (?:programs|apps|applications) are (?:running|open)",
+             self._running_programs),
+            (r"where am i|what(?:'s| is) my (?:current )?location|(?:get|show)(?: me)? my location", self._location),
+            (r"(?:(?:what|how)(?:'s| is) the |(?:show|get)(?: me)? the )?weather(?: like)?(?: today| now)?"
+             r"(?: (?:in|for|at) (?P<location>[a-z][a-z .'-]*?))?(?: today| now)?", self._weather),
+            (r"(?:list|show)(?: me)?(?: all)?(?: the)? (?:files|contents|items|everything)"
+             r"(?: here| in (?:this|the current) (?:folder|directory))?"
+             r"|what(?:'s| is) (?:here|in this (?:folder|directory)|in the current (?:folder|directory))|ls|dir",
+             self._list_here),
+            (r"(?:list|show)(?: me)?(?: all)?(?: the)? (?:files|contents|items)(?: of| in| inside) "
+             rf"[\"']?(?P<path>(?:{_WINDOWS_PATH}|/|~).*?)[\"']?", self._list_path),
+            (r"(?:open|launch|start|run)(?: up)? (?:the |my )?(?P<app>.+?)(?: app| application| program)?",
+             self._open_application),
+            (r"(?:close|quit|exit|kill|stop) (?:the |my )?(?P<app>.+?)(?: app| application| program)?",
+             self._close_program),
+            (r"(?:hi|hello|hey|good (?:morning|afternoon|evening))(?: there)?(?: filewise| jarvis)?", self._greeting),
+            (r"(?:thanks|thank you)(?: so much| very much| a lot)?(?: filewise| jarvis)?", self._thanks),
+        ]
+        self._rules = [(re.compile(pattern, re.I), build) for pattern, build in rules]
+
+    def match(self, text, current_dir="."):
+        """(command, confidence) of the best rule, or (None, 0.0)"""
+        text = normalize(text)
+        best, best_confidence = None, 0.0
+        for pattern, build in self._rules:
+            found = pattern.fullmatch(text)
+            if not found:
+                continue
+            command, confidence = build(found, current_dir)
+            if confidence > best_confidence:
+                best, best_confidence = command, confidence
+        return best, best_confidence
+
+    def parse(self, text, current_dir="."):
+        """The command for text when a rule is confident enough, otherwise None"""
+        command, confidence = self.match(text, current_dir)
+        with self._lock:
+            if command is not None and confidence >= self.threshold:
+                self.resolved += 1
+                return command
+            self.deferred += 1
+        return None
+
+    def stats(self):
+        total = self.resolved + self.deferred
+        return {
+            "resolved_locally": self.resolved,
+            "sent_to_model": self.deferred,
+            "local_ratio": round(self.resolved / total, 3) if total else None,
+            "threshold": self.threshold,
+        }
+
+    # -------------------- RULES --------------------
+
+    @staticmethod
+    def _command(name, **parameters):
+        return {"command": name, "parameters": parameters}
+
+    def _time(self, found, current_dir):
+        return self._command("get_current_time"), 0.98
+
+    def _system_info(self, found, current_dir):
+        return self._command("get_system_info"), 0.95
+
+    def _running_programs(self, found, current_dir):
+        return self._command("list_running_programs"), 0.95
+
+    def _location(self, found, current_dir):
+        return self._command("get_location"), 0.95
+
+    def _weather(self, found, current_dir):
+        location = found.group("location")
+        if location:
+            return self._command("get_weather", location=location.strip().title()), 0.92
+        return self._command("get_weather"), 0.95
+
+    def _list_here(self, found, current_dir):
+        return self._command("list_directory", path=current_dir or "."), 0.95
+
+    def _list_path(self, found, current_dir):
+        path = os.path.expanduser(found.group("path").strip())
+        # A path that does not exist is more likely a misheard name; let the model sort it out
+        return self._command("list_directory", path=path), 0.92 if os.path.isdir(path) else 0.5
+
+    def _open_application(self, found, current_dir):
+        app = found.group("app").lower().strip()
+        if app in self.applications:
+            return self._command("open_application", application=app), 0.95
+        return self._command("open_application", application=app), 0.3
+
+    def _close_program(self, found, current_dir):
+        app = found.group("app").lower().strip()
+        executable = self.applications.get(app, "").split(" ")[0]
+        if executable.endswith(".exe"):
+            # _close_program matches against process names, which are executable names
+            return self._command("close_program", program_name=executable[:-4]), 0.93
+        return self._command("close_program", program_name=app), 0.3
+
+    def _greeting(self, found, current_dir):
+        return self._command("respond", message="Hello! What would you like to do with your files today?"), 0.95
+
+    def _thanks(self, found, current_dir):
+        return self._command("respond", message="You're welcome! Anything else?"), 0.95
@@ -17,16 +17,17 @@ import shutil
 import json
 import pathlib
 import sys
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import subprocess
 import threading
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
 import speech_recognition as sr
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import re
 import pyttsx3
@@ -37,6 +38,26 @@ import platform
 import socket
 import geocoder
 import requests
+from file_index import FileIndex, SORT_KEYS, parse_size, parse_time
+from embedding_index import EmbeddingIndex
+from query_cache import QueryCache
+from intent_parser import IntentParser
+from rate_limiter import RateLimitScheduler, QuotaExceeded
+from model_router import ModelRouter
+from plan_cache import PlanCache
+from semantic_matcher import NgramMatcher, name_terms
+from bounded_cache import BoundedCache
+from path_prefix_index import PathPrefixIndex
+from file_table import FileTable
+from memory_journal import MemoryJournal
+from context_builder import ContextBuilder, elide
+from chat_session import BoundedChat
+from session_registry import AgentSession, SessionRegistry, DEFAULT_SESSION_ID
+from fs_watcher import IndexWatcher
+from parallel_walker import ParallelWalker, DEFAULT_THREADS
+from ignore_rules import IgnoreConfig
+from content_index import ContentIndex
+from grep_engine import GrepEngine
 
 API_KEY = ''
 with open('../../GPT_SECRET_KEY.json', 'r') as file_to_read:
@@ -45,6 +66,46 @@ with open('../../GPT_SECRET_KEY.json', 'r') as file_to_read:
 os.environ["API_KEY"] = API_KEY
 
 model_name = "gemini-2.5-flash-lite"
+# Models the router may use, preferred first; gemini-2.5-pro (100 requests a day) is left out unless asked for
+ROUTED_MODELS = [
+    name.strip() for name in os.environ.get(
+        "FILEWISE_MODELS", f"{model_name},gemini-2.0-flash-lite,gemini-2.0-flash,gemini-2.5-flash"
+    ).split(",") if name.strip()
+]
+
+# Threads used for directory walks (search fallback, copy, sizing, index builds)
+WALKER_THREADS = int(os.environ.get("FILEWISE_WALK_THREADS", DEFAULT_THREADS))
+
+# Cap on search_item matches unless the model asks for a different max_results
+DEFAULT_MAX_RESULTS = 500
+# How many n-gram candidates the term heuristic re-ranks in find_semantic_match
+RERANK_CANDIDATES = 10
+# Memory budget of all caches together (a quarter for query results, the rest split across sessions) and their lifetime
+CACHE_MAX_BYTES = int(float(os.environ.get("FILEWISE_CACHE_MB", 64)) * 1024 * 1024)
+CACHE_TTL_SECONDS = float(os.environ.get("FILEWISE_CACHE_TTL", 3600))
+# Most recent cached searches restored from the journal after a restart
+WARM_START_SEARCHES = 50
+# Token budget for the conversation history sent with every prompt
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("FILEWISE_CONTEXT_TOKENS", 600))
+# Size at which the Gemini chat history is summarized and the chat restarted
+CHAT_TOKEN_LIMIT = int(os.environ.get("FILEWISE_CHAT_TOKENS", 8000))
+# Client sessions: idle lifetime and how many are kept at once
+SESSION_IDLE_SECONDS = float(os.environ.get("FILEWISE_SESSION_IDLE", 30 * 60))
+MAX_SESSIONS = int(os.environ.get("FILEWISE_MAX_SESSIONS", 64))
+# Answer unambiguous everyday requests ("what time is it", "open notepad") without calling Gemini
+LOCAL_INTENTS = os.environ.get("FILEWISE_LOCAL_INTENTS", "1") != "0"
+# Longest a prompt waits for Gemini quota before the user is told to retry
+LLM_MAX_WAIT_SECONDS = float(os.environ.get("FILEWISE_LLM_MAX_WAIT", 20))
+# Longest one model may take to answer before the router tries the next
+LLM_TIMEOUT_SECONDS = float(os.environ.get("FILEWISE_LLM_TIMEOUT", 30))
+# How long the model's plan for a repeated read-only prompt is reused; 0 turns the plan cache off
+PLAN_CACHE_TTL = float(os.environ.get("FILEWISE_PLAN_TTL", 600))
+# Threads that run commands for /file-agent; requests beyond this queue instead of starting more threads
+COMMAND_WORKERS = int(os.environ.get("FILEWISE_COMMAND_WORKERS", 16))
+# Longest a /file-agent request may take, queueing for Gemini included
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("FILEWISE_REQUEST_TIMEOUT", 120))
+# How often a request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
 
 try:
     genai.configure(api_key=str(os.environ["API_KEY"]))
@@ -53,15 +114,70 @@ except AttributeError:
     sys.exit(1)
 
 class ConversationMemory:
-    def __init__(self, max_history=10):
+    def __init__(self, max_history=10, journal=None, max_bytes=CACHE_MAX_BYTES):
         self.history = []
         self.max_history = max_history
-        self.search_results_cache = {}  # Cache for search results
-        self.file_semantic_cache = {}   # Cache for file semantic analysis
+        # Optional MemoryJournal; its contents are loaded on first use, not at boot
+        self.journal = journal
+        self._warm = journal is None
+        self._warm_lock = threading.Lock()
+        self.context_builder = ContextBuilder()
+        # Cache for search results
+        self.search_results_cache = BoundedCache(
+            max_bytes * 3 // 4, default_ttl=CACHE_TTL_SECONDS, on_evict=self._on_cache_evict
+        )
+        # Cache for file semantic analysis
+        self.file_semantic_cache = BoundedCache(max_bytes // 4, default_ttl=CACHE_TTL_SECONDS)
         self.conversation_context = {}  # Store conversation context
+        # Search root of every cached search, so lookups only visit that root and below
+        self._cache_paths = PathPrefixIndex()
+        # Vectorizes cached file names; the vectors are stored in each search's cache entry
+        self._matcher = NgramMatcher()
+
+    def _warm_start(self):
+        """Restore recent turns and still-fresh cached searches from the journal, once"""
+        if self._warm:
+            return
+        with self._warm_lock:
+            if self._warm:
+                return
+            self.history = self.journal.recent_interactions(self.max_history) + self.history
+            now = time.time()
+            for key, record in self.journal.recent_searches(WARM_START_SEARCHES, CACHE_TTL_SECONDS):
+                remaining = CACHE_TTL_SECONDS - (now - record['timestamp'])
+                if remaining > 0:
+                    self._store_search(key, record['search_path'], record['folders'], record['files'],
+                                       record['timestamp'], ttl=remaining)
+            self._warm = True
+
+    def set_budget(self, max_bytes):
+        """Resize both caches to a new share of the memory budget"""
+        self.search_results_cache.set_max_bytes(max_bytes * 3 // 4)
+        self.file_semantic_cache.set_max_bytes(max_bytes // 4)
+
+    def close(self):
+        """Compact and close the journal of a session that has ended"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.compact(max_age=CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"Memory journal compaction failed: {e}")
+        self.journal.close()
+
+    def _journal(self, method, *args):
+        if self.journal is None:
+            return
+        try:
+            getattr(self.journal, method)(*args)
+            if self.journal.should_compact():
+                self.journal.compact(max_age=CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"Memory journal write failed: {e}")
     
     def add_interaction(self, user_input, agent_response, command_result):
         """Add a conversation turn to memory"""
+        self._warm_start()
         interaction = {
             "user_input": user_input,
             "agent_response": agent_response,
@@ -69,70 +185,118 @@ class ConversationMemory:
             "timestamp": time.time()
         }
         self.history.append(interaction)
+        # Only what the context builder would render goes to disk: no file bodies, no full result lists
+        self._journal("append_interaction", {
+            **interaction, "agent_response": elide(agent_response), "command_result": elide(command_result),
+        })
         
         # Keep only recent history
         if len(self.history) > self.max_history:
             self.history = self.history[-self.max_history:]
     
-    def get_context(self):
-        """Get recent conversation context"""
-        if not self.history:
-            return "No previous conversation."
-        
-        context = "Previous conversation:\n"
-        for i, interaction in enumerate(self.history[-3:]):  # Last 3 interactions
-            context += f"User: {interaction['user_input']}\n"
-            context += f"Agent: {interaction['agent_response']}\n"
-            if 'error' in interaction['command_result']:
-                context += f"Result: Error - {interaction['command_result']['error']}\n"
-            context += "---\n"
-        return context
+    def get_context(self, user_prompt="", budget_tokens=CONTEXT_TOKEN_BUDGET):
+        """Get the past turns most relevant to user_prompt, within a token budget"""
+        self._warm_start()
+        return self.context_builder.build(self.history, user_prompt, budget_tokens)
     
     def cache_search_results(self, search_path, keyword, results):
         """Cache search results for semantic matching"""
+        self._warm_start()
         key = f"{search_path}:{keyword.lower()}"
-        self.search_results_cache[key] = {
-            'results': results,
-            'timestamp': time.time(),
-            'files': self._extract_file_info(results)
-        }
+        found = results.get('results', results)
+        folders, files, timestamp = list(found.get('folders', [])), list(found.get('files', [])), time.time()
+        self._store_search(key, search_path, folders, files, timestamp)
+        self._journal("append_search", key, search_path, folders, files, timestamp)
+
+    def _store_search(self, key, search_path, folders, files, timestamp, ttl=None):
+        # Files are kept only as a columnar FileTable; the response dict is not retained
+        table = self._extract_file_info({'files': files})
+        stored = self.search_results_cache.set(key, {
+            'search_path': search_path,
+            'folders': folders,
+            'timestamp': timestamp,
+            'files': table,
+            # Counted in the entry's size, so eviction sees the vectors too
+            'vectors': self._matcher.vectorize(table)
+        }, ttl=ttl)
+        if stored:
+            self._cache_paths.add(search_path, key)
     
+    def apply_fs_event(self, kind, path, destination=None):
+        """Drop or rewrite cached search hits affected by a filesystem change"""
+        if kind not in ("deleted", "moved"):
+            return
+        self._warm_start()
+        prefix = path.rstrip(os.sep) + os.sep
+
+        def affected(p):
+            return p == path or p.startswith(prefix)
+
+        def relocate(p):
+            return destination + p[len(path):] if kind == "moved" else None
+
+        # Runs on the watcher thread; items() returns a snapshot
+        def rewrite(paths):
+            return [relocate(p) if affected(p) else p for p in paths if not affected(p) or kind == "moved"]
+
+        for cache_key, cache_data in self.search_results_cache.items():
+            changed = False
+            if any(affected(p) for p in cache_data['folders']):
+                cache_data['folders'] = rewrite(cache_data['folders'])
+                changed = True
+            if any(affected(p) for p in cache_data['files'].paths()):
+                cache_data['files'] = FileTable(rewrite(cache_data['files'].paths()))
+                cache_data['vectors'] = self._matcher.vectorize(cache_data['files'])
+                changed = True
+            if changed:
+                self.search_results_cache.resize(cache_key)
+                self._journal("append_search", cache_key, cache_data['search_path'], cache_data['folders'],
+                              list(cache_data['files'].paths()), cache_data['timestamp'])
+
+    def _on_cache_evict(self, key, value):
+        self._cache_paths.remove(value['search_path'], key)
+
+    def cache_stats(self):
+        return {
+            "search_results": self.search_results_cache.stats(),
+            "file_semantic": self.file_semantic_cache.stats(),
+            "journal": self.journal.status() if self.journal else None,
+        }
+
     def _extract_file_info(self, results):
-        """Extract file information for semantic matching"""
-        files = []
-        if 'results' in results:
-            for file_path in results['results'].get('files', []):
-                filename = os.path.basename(file_path)
-                name_without_ext = os.path.splitext(filename)[0]
-                files.append({
-                    'path': file_path,
-                    'name': filename,
-                    'name_without_ext': name_without_ext,
-                    'folder': os.path.dirname(file_path)
-                })
-        return files
-    
-    def find_semantic_match(self, search_path, user_query, threshold=0.3):
-        """Find semantically similar files using cached results"""
+        """Extract file information for semantic matching, as one compact FileTable"""
+        # _search_item caches the bare {"files", "folders"} dict; full responses nest it
+        found = results.get('results', results)
+        return FileTable(found.get('files', []))
+
+    def find_semantic_match(self, search_path, user_query, threshold=0.3, candidates=RERANK_CANDIDATES):
+        """Find semantically similar files using cached results
+
+        Hashed n-grams shortlist the closest cached names in one sparse product; only
+        that shortlist is re-scored with the term heuristic, whose score (and
+        therefore threshold) is what the caller sees.
+        """
+        self._warm_start()
         best_match = None
         best_score = 0
-        
+
         # Extract key terms from user query
-        query_terms = re.findall(r'\w+', user_query.lower())
-        
-        for cache_key, cache_data in self.search_results_cache.items():
-            if search_path in cache_key:
-                for file_info in cache_data.get('files', []):
-                    # Compare with filename without extension
-                    filename_terms = re.findall(r'\w+', file_info['name_without_ext'].lower())
-                    
-                    # Calculate similarity using multiple methods
-                    similarity = self._calculate_similarity(query_terms, filename_terms)
-                    
-                    if similarity > best_score and similarity > threshold:
-                        best_score = similarity
-                        best_match = file_info
-        
+        query_terms = name_terms(user_query)
+        # Searches cached for search_path or a folder below it; get_many() marks them
+        # recently used and counts the hits. The matcher scores their files as one
+        # candidate set, each path once however many searches cached it.
+        groups = [(cached['files'], cached['vectors'])
+                  for _, cached in self.search_results_cache.get_many(self._cache_paths.under(search_path))]
+
+        for file_info, _ in self._matcher.top_k(user_query, groups, candidates):
+            # Compare with filename without extension
+            filename_terms = name_terms(file_info['name_without_ext'])
+            similarity = self._calculate_similarity(query_terms, filename_terms)
+
+            if similarity > best_score and similarity > threshold:
+                best_score = similarity
+                best_match = file_info
+
         return best_match, best_score
     
     def _calculate_similarity(self, query_terms, filename_terms):
@@ -164,12 +328,29 @@ class ConversationMemory:
 class EnhancedFileAgent:
     def __init__(self, system_prompt):
         self.system_prompt = system_prompt
-        self.model = genai.GenerativeModel(model_name)
-        self.conversation = self.model.start_chat(history=[
-            {"role": "user", "parts": [self.system_prompt]},
-            {"role": "model", "parts": ["Understood. I am FileWise. Ready to assist."]}
-        ])
-        self.memory = ConversationMemory()
+        # Shared by every session: the quota belongs to the API key, not to a client
+        self.rate_limiter = RateLimitScheduler(max_wait=LLM_MAX_WAIT_SECONDS)
+        # Stands in for a GenerativeModel; each message goes to the model with the most headroom
+        self.model = ModelRouter(genai.GenerativeModel, ROUTED_MODELS, self.rate_limiter, timeout=LLM_TIMEOUT_SECONDS)
+        # Chat, memory and cwd live in a per-client session; indexes and walkers are shared
+        self.sessions = SessionRegistry(
+            self._new_session, idle_timeout=SESSION_IDLE_SECONDS, max_sessions=MAX_SESSIONS, on_evict=self._end_session
+        )
+        self._local = threading.local()
+        self.walker = ParallelWalker(threads=WALKER_THREADS)
+        self.ignore_config = IgnoreConfig()
+        self.file_index = FileIndex(walker=self.walker, ignore_provider=self.ignore_config.rules_for)
+        self.content_index = ContentIndex(walker=self.walker, ignore_provider=self.ignore_config.rules_for)
+        self.grep_engine = GrepEngine(self.walker)
+        self.embedding_index = EmbeddingIndex(self.file_index)
+        # Exact name-search results, shared by every session since they only describe the disk
+        self.query_cache = QueryCache(CACHE_MAX_BYTES // 4, ttl=CACHE_TTL_SECONDS)
+        self.index_watcher = IndexWatcher(self.file_index, on_change=self._on_fs_change, walker=self.walker)
+        for root in self.file_index.root_paths():
+            self.index_watcher.watch(root)
+        for root in self.content_index.root_paths():
+            self.index_watcher.watch(root, contents=True)
+        self.index_watcher.start()
         self.pending_command = None
 
         # Common Windows applications mapping
@@ -198,6 +379,51 @@ class EnhancedFileAgent:
             "settings": "ms-settings:",
             "store": "ms-windows-store:"
         }
+        self.intent_parser = IntentParser(self.windows_apps)
+        self.plan_cache = PlanCache(ttl=PLAN_CACHE_TTL)
+        self.command_executor = ThreadPoolExecutor(max_workers=COMMAND_WORKERS, thread_name_prefix="filewise-command")
+
+    def _new_session(self, session_id):
+        others = self.sessions.sessions()
+        budget = self._rebalance_memory(others, len(others) + 1)
+        return AgentSession(
+            session_id,
+            # System prompt plus a rolling window of turns; older turns are summarized
+            conversation=BoundedChat(self.model, self.system_prompt, token_limit=CHAT_TOKEN_LIMIT),
+            memory=ConversationMemory(journal=MemoryJournal(session=session_id), max_bytes=budget),
+        )
+
+    def _end_session(self, session):
+        session.memory.close()
+        others = self.sessions.sessions()
+        self._rebalance_memory(others, len(others))
+
+    def _rebalance_memory(self, sessions, count):
+        """Give each of count sessions an equal share of the cache budget left after the query cache"""
+        budget = (CACHE_MAX_BYTES - CACHE_MAX_BYTES // 4) // max(1, count)
+        for session in sessions:
+            session.memory.set_budget(budget)
+        return budget
+
+    @property
+    def session(self):
+        """The session of the request running on this thread (the default session otherwise)"""
+        session = getattr(self._local, "session", None)
+        return session if session is not None else self.sessions.get(DEFAULT_SESSION_ID)
+
+    @property
+    def memory(self):
+        return self.session.memory
+
+    def _on_fs_change(self, kind, path, destination=None):
+        """Fan a watcher event out to every cache that mirrors the disk"""
+        for session in self.sessions.sessions():
+            session.memory.apply_fs_event(kind, path, destination)
+        if kind != "modified":
+            self.query_cache.invalidate(path)
+            if destination:
+                self.query_cache.invalidate(destination)
+        self.content_index.apply_fs_event(kind, path, destination)
 
     def _summarize_action(self, command: dict, result: dict) -> str:
         cmd = command.get("command", "")
@@ -638,24 +864,87 @@ class EnhancedFileAgent:
         search_type = kwargs.get("search_type", "both")
         use_semantic = kwargs.get("use_semantic", False)
         semantic_threshold = kwargs.get("semantic_threshold", 0.3)
+        # Set by the streaming endpoint; called with (path, "file" | "folder") per hit, returns True once nobody listens
+        on_match = kwargs.get("on_match")
+        # Early-termination limits
+        first_match = bool(kwargs.get("first_match", False))
+        max_results = 1 if first_match else int(kwargs.get("max_results") or DEFAULT_MAX_RESULTS)
+        max_depth = kwargs.get("max_depth")
+        max_depth = int(max_depth) if max_depth is not None else None
+        timeout_ms = kwargs.get("timeout_ms")
+        deadline = time.monotonic() + float(timeout_ms) / 1000 if timeout_ms else None
+        include_ignored = bool(kwargs.get("include_ignored", False))
         
         results = {"files": [], "folders": [], "semantic_matches": []}
+        truncated_reason = None
         
         try:
             if not os.path.exists(search_path):
                 return {"error": f"Search path does not exist: {search_path}"}
             
-            # First, try exact search
-            for root, dirs, files in os.walk(search_path):
-                if search_type in ["both", "folder"]:
-                    for d in dirs:
-                        if keyword.lower() in d.lower():
-                            results["folders"].append(os.path.join(root, d))
-                
-                if search_type in ["both", "file"]:
-                    for f in files:
-                        if keyword.lower() in f.lower():
-                            results["files"].append(os.path.join(root, f))
+            # First, try exact search - a still-valid earlier answer, then the filename index
+            # when this path is indexed (ignored folders are never indexed, so include_ignored always walks)
+            query_key = self.query_cache.key(search_path, keyword, search_type, max_results, max_depth, include_ignored)
+            cached = self.query_cache.get(query_key)
+            # A walk reports matches as it finds them; other answers are replayed below
+            streamed = False
+            if cached is not None:
+                results["files"], results["folders"] = list(cached["files"]), list(cached["folders"])
+                truncated_reason = cached["truncated_reason"]
+            elif not include_ignored and self.file_index.covering_root(search_path):
+                found = self.file_index.search(keyword, search_path, search_type, max_results, max_depth)
+                if found.pop("truncated"):
+                    truncated_reason = "max_results"
+                results.update(found)
+                # Watcher events for this root invalidate the entry
+                self.query_cache.put(query_key, results["files"], results["folders"], truncated_reason)
+            else:
+                streamed = True
+                keyword_lower = keyword.lower()
+                found = 0
+                descend = (lambda path, name, depth: depth < max_depth) if max_depth is not None else None
+                rules = None if include_ignored else self.ignore_config.rules_for(search_path)
+                ignore = rules.walker_filter() if rules else None
+                # Folder mtimes taken before each folder is listed; any later rename inside one moves it
+                dir_mtimes = {search_path: os.stat(search_path).st_mtime_ns}
+                walk = self.walker.walk(search_path, descend=descend, with_stat=True, ignore=ignore,
+                                        deadline=deadline)
+                try:
+                    for seen, entry in enumerate(walk):
+                        # Closing the walk generator on break stops the worker threads
+                        if deadline and seen % 256 == 0 and time.monotonic() > deadline:
+                            truncated_reason = "timeout"
+                            break
+                        if entry.is_dir and (max_depth is None or entry.depth < max_depth):
+                            dir_mtimes[entry.path] = entry.stat.st_mtime_ns
+                        if keyword_lower not in entry.name.lower():
+                            continue
+                        if entry.is_dir and search_type in ["both", "folder"]:
+                            bucket, kind = "folders", "folder"
+                        elif not entry.is_dir and search_type in ["both", "file"]:
+                            bucket, kind = "files", "file"
+                        else:
+                            continue
+                        results[bucket].append(entry.path)
+                        found += 1
+                        if on_match and on_match(entry.path, kind):
+                            truncated_reason = "cancelled"
+                            break
+                        if found >= max_results:
+                            truncated_reason = "max_results"
+                            break
+                except TimeoutError:
+                    # Raised by the walker when no folder came back in time, e.g. a stalled network share
+                    truncated_reason = "timeout"
+                # A timed-out or abandoned walk depends on machine load or the client, not on the disk
+                if truncated_reason not in ("timeout", "cancelled"):
+                    self.query_cache.put(query_key, results["files"], results["folders"], truncated_reason, dir_mtimes)
+
+            if on_match and not streamed:
+                for folder in results["folders"]:
+                    on_match(folder, "folder")
+                for file in results["files"]:
+                    on_match(file, "file")
             
             # If no exact matches found and semantic search is enabled
             if use_semantic and not results["files"] and not results["folders"]:
@@ -670,12 +959,25 @@ class EnhancedFileAgent:
                         "similarity_score": round(similarity_score, 2),
                         "type": "semantic"
                     })
+                elif self.embedding_index.is_built():
+                    # Nothing similar among cached searches; ask the semantic index over everything indexed
+                    for path, _, score in self.embedding_index.search(keyword, search_path, 1, search_type=search_type):
+                        if score >= semantic_threshold:
+                            results["semantic_matches"].append({
+                                "path": path,
+                                "name": os.path.basename(path),
+                                "similarity_score": round(score, 2),
+                                "type": "semantic"
+                            })
             
             # Cache the results for future semantic matching
             self.memory.cache_search_results(search_path, keyword, results)
             
-            # Auto-open if single result found
-            if len(results["files"]) == 1 and not results["folders"] and not results["semantic_matches"]:
+            # Auto-open if single result found (a capped search may have more, unless first_match was asked for)
+            capped = truncated_reason or len(results["files"]) + len(results["folders"]) >= max_results
+            if capped and not first_match:
+                pass
+            elif len(results["files"]) == 1 and not results["folders"] and not results["semantic_matches"]:
                 self._open_file(results["files"][0])
             elif len(results["folders"]) == 1 and not results["files"] and not results["semantic_matches"]:
                 self._open_folder(results["folders"][0])
@@ -694,12 +996,155 @@ class EnhancedFileAgent:
                 "results": results, 
                 "keyword": keyword,
                 "search_path": search_path,
-                "total_found": len(results["files"]) + len(results["folders"]) + len(results["semantic_matches"])
+                "total_found": len(results["files"]) + len(results["folders"]) + len(results["semantic_matches"]),
+                "truncated": truncated_reason is not None,
+                "truncated_reason": truncated_reason,
+                "cached": cached is not None
             }
             
         except Exception as e:
             return {"error": f"Search failed: {str(e)}"}
 
+    def _rebuild_index(self, path="."):
+        """Build (or rebuild) the persistent filename index for a search root"""
+        try:
+            result = self.file_index.build(path)
+            if "error" not in result:
+                self.index_watcher.watch(result["root"])
+                self.query_cache.invalidate_under(result["root"])
+                if self.embedding_index.is_built():
+                    # The rebuilt root is new to the semantic index; refresh it without holding the request
+                    self.command_executor.submit(self.embedding_index.build)
+                    result["semantic_index"] = "rebuilding"
+            return result
+        except Exception as e:
+            return {"error": f"Index build failed: {str(e)}"}
+
+    def _index_status(self):
+        """Report which roots are indexed and how large the index is"""
+        try:
+            status = self.file_index.status()
+            status["content_index"] = self.content_index.status()
+            status["semantic_index"] = self.embedding_index.status()
+            status["watcher"] = self.index_watcher.status()
+            return status
+        except Exception as e:
+            return {"error": f"Could not read index status: {str(e)}"}
+
+    def _build_semantic_index(self):
+        """Embed every entry of the filename index for semantic_search (replaces the previous build)"""
+        try:
+            return self.embedding_index.build()
+        except Exception as e:
+            return {"error": f"Semantic index build failed: {str(e)}"}
+
+    def _semantic_search(self, query="", path=None, max_results=10, search_type="both"):
+        """Find files whose names mean roughly the same as the query, using the semantic index"""
+        try:
+            if not query:
+                return {"clarify": "What kind of file are you looking for?"}
+            if not self.embedding_index.is_built():
+                return {"error": "The semantic index has not been built yet; run build_semantic_index first"}
+            search_path = os.path.abspath(path) if path else None
+            found = self.embedding_index.search(query, search_path, int(max_results), search_type=search_type)
+            return {
+                "query": query,
+                "search_path": search_path,
+                "matches": [
+                    {"path": item_path, "type": "folder" if is_dir else "file", "score": round(score, 2)}
+                    for item_path, is_dir, score in found
+                ],
+                "total_found": len(found),
+            }
+        except Exception as e:
+            return {"error": f"Semantic search failed: {str(e)}"}
+
+    def _index_content(self, path="."):
+        """Add a folder to the full-text content index, or refresh it (only changed files are re-read)"""
+        try:
+            result = self.content_index.refresh(path)
+            if "error" not in result:
+                self.index_watcher.watch(result["root"], contents=True)
+            return result
+        except Exception as e:
+            return {"error": f"Content indexing failed: {str(e)}"}
+
+    def _search_content(self, query="", path=None, max_results=20):
+        """Search inside text files using the persistent content index"""
+        try:
+            if not query:
+                return {"clarify": "What text would you like me to search for inside your files?"}
+            search_path = os.path.abspath(path) if path else None
+            if search_path and not self.content_index.covering_root(search_path):
+                return {
+                    "clarify": f"'{search_path}' is not in the content index yet. Should I index it first? "
+                               f"That reads every text file there once."
+                }
+            if not self.content_index.root_paths():
+                return {"clarify": "No folders are indexed for content search yet. Which folder should I index?"}
+            matches = self.content_index.search(query, search_path, max_results)
+            return {
+                "query": query,
+                "search_path": search_path,
+                "matches": matches,
+                "total_found": len(matches),
+            }
+        except Exception as e:
+            return {"error": f"Content search failed: {str(e)}"}
+
+    def _grep_files(self, pattern="", path=".", regex=False, case_sensitive=False, max_results=200,
+                    include=None, include_ignored=False):
+        """Scan file contents directly (no index needed) and report matching lines"""
+        try:
+            if not pattern:
+                return {"clarify": "What text should I look for inside the files?"}
+            abs_path = os.path.abspath(path)
+            if not os.path.isdir(abs_path):
+                return {"error": f"Search path does not exist: {abs_path}"}
+            if isinstance(include, str):
+                include = [p.strip() for p in include.split(",") if p.strip()]
+            rules = None if include_ignored else self.ignore_config.rules_for(abs_path)
+            records, truncated = self.grep_engine.grep(
+                pattern, abs_path, is_regex=bool(regex), case_sensitive=bool(case_sensitive),
+                max_results=int(max_results), include=include,
+                ignore=rules.walker_filter() if rules else None,
+            )
+            return {
+                "pattern": pattern,
+                "search_path": abs_path,
+                "matches": [{"path": p, "line": line, "snippet": text} for p, line, text in records],
+                "total_found": len(records),
+                "truncated": truncated,
+            }
+        except re.error as e:
+            return {"error": f"Invalid regular expression '{pattern}': {str(e)}"}
+        except Exception as e:
+            return {"error": f"Grep failed: {str(e)}"}
+
+    def _get_ignore_rules(self, path="."):
+        """Show the ignore patterns that apply when searching or indexing a folder"""
+        try:
+            abs_path = os.path.abspath(path)
+            return {"path": abs_path, "patterns": self.ignore_config.patterns_for(abs_path)}
+        except Exception as e:
+            return {"error": f"Could not read ignore rules: {str(e)}"}
+
+    def _set_ignore_rules(self, path=".", patterns=None, use_defaults=True):
+        """Save extra ignore patterns for a search root"""
+        try:
+            abs_path = os.path.abspath(path)
+            if isinstance(patterns, str):
+                patterns = [p.strip() for p in patterns.split(",")]
+            rules = self.ignore_config.set_rules(abs_path, patterns, use_defaults)
+            # Rules can reach searches rooted above abs_path too
+            self.query_cache.clear()
+            message = f"Saved {len(patterns or [])} ignore patterns for '{abs_path}'"
+            if self.file_index.covering_root(abs_path):
+                message += ". Run rebuild_index to apply them to the filename index"
+            return {"message": message, "path": abs_path, "patterns": rules.patterns}
+        except Exception as e:
+            return {"error": f"Could not save ignore rules: {str(e)}"}
+
     def _list_directory(self, path="."):
         try:
             items = os.listdir(path)
@@ -795,6 +1240,7 @@ class EnhancedFileAgent:
             abs_path = os.path.abspath(path)
             with open(abs_path, "w", encoding="utf-8") as f:
                 f.write(content)
+            self.index_watcher.notify("created", abs_path)
             if open_after:
                 os.startfile(abs_path)
             return {"message": f"Created file '{abs_path}'"}
@@ -806,6 +1252,7 @@ class EnhancedFileAgent:
             abs_path = os.path.abspath(path)
             with open(abs_path, "w", encoding="utf-8") as f:
                 f.write(content)
+            self.index_watcher.notify("created", abs_path)
             if open_after:
                 os.startfile(abs_path)
             return {"message": f"Wrote to '{abs_path}'"}
@@ -814,7 +1261,8 @@ class EnhancedFileAgent:
 
     def _move_item(self, source, destination):
         try:
-            shutil.move(source, destination)
+            moved_to = shutil.move(source, destination)
+            self.index_watcher.notify("moved", source, moved_to)
             return {"message": f"Successfully moved '{os.path.abspath(source)}' to '{os.path.abspath(destination)}'"}
         except FileNotFoundError:
             return {"error": f"Source '{source}' not found."}
@@ -832,10 +1280,20 @@ class EnhancedFileAgent:
             if os.path.isdir(abs_source):
                 if os.path.exists(abs_destination):
                     return {"error": f"Destination '{abs_destination}' already exists."}
-                shutil.copytree(abs_source, abs_destination)
+                try:
+                    copied_to = self._copy_tree(abs_source, abs_destination)
+                except shutil.Error as e:
+                    # Whatever did land is real; let the index see it
+                    self.index_watcher.notify("created", abs_destination)
+                    failed = e.args[0]
+                    return {
+                        "error": f"Copied '{abs_source}' to '{abs_destination}' only partially: {len(failed)} items failed",
+                        "failed": [{"source": src, "reason": reason} for src, _, reason in failed[:20]],
+                    }
             else:
                 os.makedirs(os.path.dirname(abs_destination), exist_ok=True)
-                shutil.copy2(abs_source, abs_destination)
+                copied_to = shutil.copy2(abs_source, abs_destination)
+            self.index_watcher.notify("created", copied_to)
     
             return {
                 "message": f"Successfully copied '{abs_source}' to '{abs_destination}'"
@@ -843,9 +1301,125 @@ class EnhancedFileAgent:
         except Exception as e:
             return {"error": str(e)}
 
+    def _copy_tree(self, source, destination):
+        """Copy a directory tree, streaming entries from the parallel walker into a copy pool
+
+        Follows symlinks like shutil.copytree's default: a link to a folder is
+        copied as a folder. Like copytree, it copies everything it can and
+        then raises shutil.Error listing (source, destination, reason) of
+        every entry that failed, unreadable folders included.
+        """
+        os.makedirs(destination)
+        folders = [(source, destination)]
+        errors = []
+
+        def copy_one(src, dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if os.path.isdir(src):
+                # Only symlinks reach here as folders; the walker does not follow them
+                shutil.copytree(src, dst)
+            else:
+                shutil.copy2(src, dst)
+
+        def walk_error(e):
+            errors.append((e.filename, None, str(e)))
+
+        with ThreadPoolExecutor(max_workers=self.walker.threads) as pool:
+            futures = []
+            for entry in self.walker.walk(source, on_error=walk_error):
+                target = os.path.join(destination, os.path.relpath(entry.path, source))
+                if entry.is_dir:
+                    os.makedirs(target, exist_ok=True)
+                    folders.append((entry.path, target))
+                else:
+                    futures.append((entry.path, target, pool.submit(copy_one, entry.path, target)))
+            for src, dst, future in futures:
+                try:
+                    future.result()
+                except shutil.Error as e:
+                    errors.extend(e.args[0])
+                except OSError as e:
+                    errors.append((src, dst, str(e)))
+
+        # Directory timestamps change while files land in them, so copy them last
+        for src, dst in folders:
+            try:
+                shutil.copystat(src, dst)
+            except OSError as e:
+                errors.append((src, dst, str(e)))
+        if errors:
+            raise shutil.Error(errors)
+        return destination
+
+    def _find_files(self, path=".", search_type="file", min_size=None, max_size=None,
+                    modified_after=None, modified_before=None, created_after=None, created_before=None,
+                    extensions=None, max_depth=None, name_contains=None, sort_by=None, order="desc", limit=20):
+        """Filter files by size, dates, extension and depth using the stat data kept in the filename index"""
+        try:
+            abs_path = os.path.abspath(path)
+            if not os.path.isdir(abs_path):
+                return {"error": f"Search path does not exist: {abs_path}"}
+            if sort_by and sort_by not in SORT_KEYS:
+                return {"error": f"Cannot sort by '{sort_by}'; use one of {', '.join(SORT_KEYS)}"}
+            if isinstance(extensions, str):
+                extensions = [e.strip() for e in extensions.split(",") if e.strip()]
+
+            indexed_now = False
+            if not self.file_index.covering_root(abs_path):
+                # Metadata queries only run against the index, so index this folder once
+                built = self._rebuild_index(abs_path)
+                if "error" in built:
+                    return built
+                indexed_now = True
+
+            rows, total = self.file_index.find(
+                abs_path, search_type=search_type,
+                min_size=parse_size(min_size), max_size=parse_size(max_size),
+                modified_after=parse_time(modified_after), modified_before=parse_time(modified_before),
+                created_after=parse_time(created_after), created_before=parse_time(created_before),
+                extensions=extensions, max_depth=int(max_depth) if max_depth is not None else None,
+                name_contains=name_contains, sort_by=sort_by, descending=order != "asc",
+                limit=int(limit) if limit else None,
+            )
+            matches = [
+                {
+                    "path": item_path,
+                    "type": "folder" if is_dir else "file",
+                    "size": f"{size / (1024 * 1024):.1f} MB" if size is not None and not is_dir else None,
+                    "modified": datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M") if mtime else None,
+                    "created": datetime.datetime.fromtimestamp(ctime).strftime("%Y-%m-%d %H:%M") if ctime else None,
+                }
+                for item_path, is_dir, size, mtime, ctime, _ in rows
+            ]
+            return {
+                "search_path": abs_path,
+                "matches": matches,
+                "total_found": total,
+                "truncated": total > len(matches),
+                "indexed_now": indexed_now,
+            }
+        except ValueError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"find_files failed: {str(e)}"}
+
+    def _get_directory_size(self, path="."):
+        """Get the total size of a folder using the parallel walker"""
+        try:
+            abs_path = os.path.abspath(path)
+            if not os.path.isdir(abs_path):
+                return {"error": f"Folder not found: '{abs_path}'"}
+            result = self.walker.directory_size(abs_path)
+            result["path"] = abs_path
+            result["size"] = f"{result['size_bytes'] / (1024 * 1024):.1f} MB"
+            return result
+        except Exception as e:
+            return {"error": f"Failed to get directory size: {str(e)}"}
+
     def _delete_file(self, path):
         try:
             os.remove(path)
+            self.index_watcher.notify("deleted", path)
             return {"message": f"Successfully deleted file: '{os.path.abspath(path)}'"}
         except FileNotFoundError:
             return {"error": f"File not found at '{path}'"}
@@ -856,6 +1430,7 @@ class EnhancedFileAgent:
         try:
             abs_path = os.path.abspath(path)
             os.makedirs(abs_path, exist_ok=exist_ok)
+            self.index_watcher.notify("created", abs_path)
             return {"message": f"Directory created at '{abs_path}'"}
         except Exception as e:
             return {"error": str(e)}
@@ -863,6 +1438,7 @@ class EnhancedFileAgent:
     def _delete_directory(self, path):
         try:
             shutil.rmtree(path)
+            self.index_watcher.notify("deleted", path)
             return {"message": f"Successfully deleted directory and its contents: '{os.path.abspath(path)}'"}
         except FileNotFoundError:
             return {"error": f"Directory not found at '{path}'"}
@@ -875,26 +1451,30 @@ class EnhancedFileAgent:
     def _respond(self, message):
         return {"response": message}
 
-    def _execute_command(self, response_json):
+    def _execute_command(self, response_json, on_event=None):
         try:
             if "workflow" in response_json:
                 workflow_results = []
                 for step in response_json["workflow"]:
-                    result = self._execute_single_command(step)
-                    workflow_results.append({
+                    result = self._execute_single_command(step, on_event)
+                    step_result = {
                         "command": step,
                         "result": result,
                         "summary": self._summarize_action(step, result)
-                    })
+                    }
+                    workflow_results.append(step_result)
+                    if on_event and on_event("step", step_result):
+                        # The listener is gone; do not start the remaining steps
+                        break
                 return {"workflow": workflow_results}
             else:
-                return self._execute_single_command(response_json)
+                return self._execute_single_command(response_json, on_event)
         except Exception as e:
             return {"error": f"Execution error: {str(e)}"}
 
-    def _execute_single_command(self, command_json):
+    def _execute_single_command(self, command_json, on_event=None):
         command = command_json.get("command")
-        params = command_json.get("parameters", {})
+        params = dict(command_json.get("parameters", {}))
     
         if "file_path" in params and "path" not in params:
             params["path"] = params.pop("file_path")
@@ -903,6 +1483,11 @@ class EnhancedFileAgent:
     
         if command == "execute_file":
             command = "execute_code"
+
+        if command == "search_item" and on_event:
+            params["on_match"] = lambda path, kind: on_event("match", {
+                "path": path, "name": os.path.basename(path), "type": kind
+            })
         
         # Enhanced command map with proper error handling
         command_map = {
@@ -914,6 +1499,15 @@ class EnhancedFileAgent:
             "execute_code": self._execute_code,
             "execute_file": self._execute_code,
             "search_item": self._search_item,
+            "rebuild_index": self._rebuild_index,
+            "index_status": self._index_status,
+            "build_semantic_index": self._build_semantic_index,
+            "semantic_search": self._semantic_search,
+            "index_content": self._index_content,
+            "search_content": self._search_content,
+            "grep_files": self._grep_files,
+            "get_ignore_rules": self._get_ignore_rules,
+            "set_ignore_rules": self._set_ignore_rules,
             "open_application": self._open_application,
             "list_directory": self._list_directory,
             "read_file": self._read_file,
@@ -924,6 +1518,8 @@ class EnhancedFileAgent:
             "respond": self._respond,
             "copy_item": self._copy_item,
             "create_directory": self._create_directory,
+            "get_directory_size": self._get_directory_size,
+            "find_files": self._find_files,
             
             # Browser and system operations
             "close_program": self._close_program,
@@ -943,62 +1539,137 @@ class EnhancedFileAgent:
                 return {"error": f"Error executing {command}: {str(e)}"}
         return {"error": f"Unknown command '{command}'"}
 
-    def process_request(self, user_prompt, current_dir="."):
+    def _run_plan(self, user_prompt, plan, on_event=None, **flags):
+        """Execute a plan that did not come from a fresh model answer and record the turn"""
+        if on_event and on_event("command", plan):
+            # Streamed to a client that has already gone; nothing is run on its behalf
+            return {"agent_command": plan, "result": {"error": "Request cancelled: the client disconnected"}, **flags}
+        result = self._execute_command(plan, on_event)
+        self.memory.add_interaction(user_prompt, plan, result)
+        return {"agent_command": plan, "result": result, **flags}
+
+    def _plan_without_model(self, user_prompt, current_dir):
+        """(plan, flags, plan_key, full_prompt): a local or cached plan, or else the prompt to send to the model"""
+        local_command = self.intent_parser.parse(user_prompt, current_dir) if LOCAL_INTENTS else None
+        if local_command is not None:
+            return local_command, {"resolved_locally": True}, None, None
+
         # Add conversation context to the prompt
-        conversation_context = self.memory.get_context()
+        conversation_context = self.memory.get_context(user_prompt)
+        # A read-only plan the model already made for this prompt here is replayed without asking again
+        plan_key = self.plan_cache.key(user_prompt, current_dir, conversation_context)
+        cached_plan = self.plan_cache.get(plan_key) if PLAN_CACHE_TTL else None
+        if cached_plan is not None:
+            return cached_plan, {"plan_cached": True}, None, None
         full_prompt = f"{conversation_context}\n\nCurrent Directory: '{current_dir}'\nUser: '{user_prompt}'"
+        return None, {}, plan_key, full_prompt
+
+    def _parse_plan(self, text):
+        """The command JSON in the model's answer"""
+        clean = text.strip().replace("```json", "").replace("```", "").strip()
         
+        # FIX: Handle multiple JSON objects or malformed JSON
         try:
-            response = self.conversation.send_message(full_prompt)
-            clean = response.text.strip().replace("```json", "").replace("```", "").strip()
+            return json.loads(clean)
+        except json.JSONDecodeError as e:
+            # Try to extract JSON from the response if it's malformed
+            print(f"JSON decode error: {e}. Attempting to fix...")
             
-            # FIX: Handle multiple JSON objects or malformed JSON
-            try:
-                response_json = json.loads(clean)
-            except json.JSONDecodeError as e:
-                # Try to extract JSON from the response if it's malformed
-                print(f"JSON decode error: {e}. Attempting to fix...")
-                
-                # Look for JSON patterns in the response
-                json_pattern = r'\{[^{}]*\{[^{}]*\}[^{}]*\}|\{[^{}]*\"command\"[^{}]*\}'
-                matches = re.findall(json_pattern, clean)
-                
-                if matches:
-                    # Use the first valid JSON match
-                    for match in matches:
-                        try:
-                            response_json = json.loads(match)
-                            break
-                        except:
-                            continue
-                    else:
-                        raise ValueError("No valid JSON found in response")
-                else:
-                    # If no JSON found, create a conversational response
-                    response_json = {
-                        "command": "respond",
-                        "parameters": {
-                            "message": f"I understand you want to open Google.com in Chrome. Let me do that for you."
-                        }
-                    }
-            
-            result = self._execute_command(response_json)
+            # Look for JSON patterns in the response
+            json_pattern = r'\{[^{}]*\{[^{}]*\}[^{}]*\}|\{[^{}]*\"command\"[^{}]*\}'
+            matches = re.findall(json_pattern, clean)
             
-            # Store in memory
-            self.memory.add_interaction(user_prompt, response_json, result)
-            
-            return {"agent_command": response_json, "result": result}
-            
-        except Exception as e:
-            # If everything fails, provide a helpful conversational response
-            error_response = {
+            if matches:
+                # Use the first valid JSON match
+                for match in matches:
+                    try:
+                        return json.loads(match)
+                    except:
+                        continue
+                raise ValueError("No valid JSON found in response")
+            # If no JSON found, create a conversational response
+            return {
                 "command": "respond",
                 "parameters": {
-                    "message": f"I understand you want to open Google.com in Chrome. Let me handle that for you."
+                    "message": f"I understand you want to open Google.com in Chrome. Let me do that for you."
                 }
             }
-            result = self._execute_command(error_response)
-            return {"agent_command": error_response, "result": result}
+
+    def _quota_response(self, error):
+        wait = f" Please try again in about {int(error.retry_after) + 1} seconds." if error.retry_after else " Please try again later."
+        message = f"Gemini is busy or unavailable right now.{wait}"
+        return {
+            "agent_command": {"command": "respond", "parameters": {"message": message}},
+            "result": {"error": message, "reason": str(error), "retry_after": error.retry_after},
+        }
+
+    def _fallback_response(self):
+        # If everything fails, provide a helpful conversational response
+        error_response = {
+            "command": "respond",
+            "parameters": {
+                "message": f"I understand you want to open Google.com in Chrome. Let me handle that for you."
+            }
+        }
+        result = self._execute_command(error_response)
+        return {"agent_command": error_response, "result": result}
+
+    async def process_request_async(self, user_prompt, current_dir=None, session_id=DEFAULT_SESSION_ID, on_event=None):
+        """Handle one prompt inside the caller's session; turns of one session never interleave
+
+        The Gemini call is awaited; everything that touches the disk or the
+        journal, session creation included, runs on the bounded command
+        executor. on_event is called there too. Cancelling the task (timeout,
+        client gone) abandons the model call at once and drops commands that
+        have not started; one already running finishes on its worker and the
+        session stays locked until it has.
+        """
+        loop = asyncio.get_running_loop()
+        # A new session opens its journal (SQLite DDL); keep that off the loop
+        session = await loop.run_in_executor(self.command_executor, self.sessions.get, session_id)
+        await session.acquire_async()
+        running = []
+        try:
+            if current_dir:
+                session.current_dir = current_dir
+            session.requests += 1
+            return await self._process_request_async(session, user_prompt, running, on_event)
+        finally:
+            session.last_used = time.monotonic()
+            unfinished = [future for future in running if not future.cancel() and not future.done()]
+            if unfinished:
+                unfinished[-1].add_done_callback(lambda _: session.release())
+            else:
+                session.release()
+
+    async def _in_session(self, session, running, function, *args, **kwargs):
+        """Run a blocking call on the command executor with session bound to the worker thread"""
+        def call():
+            self._local.session = session
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.session = None
+
+        future = self.command_executor.submit(call)
+        running.append(future)
+        return await asyncio.wrap_future(future)
+
+    async def _process_request_async(self, session, user_prompt, running, on_event=None):
+        plan, flags, plan_key, full_prompt = await self._in_session(
+            session, running, self._plan_without_model, user_prompt, session.current_dir
+        )
+        if plan is None:
+            try:
+                response = await session.conversation.send_message_async(full_prompt)
+                plan = self._parse_plan(response.text)
+            except QuotaExceeded as e:
+                return self._quota_response(e)
+            except Exception as e:
+                return await self._in_session(session, running, self._fallback_response)
+            if PLAN_CACHE_TTL:
+                self.plan_cache.put(plan_key, plan)
+        return await self._in_session(session, running, self._run_plan, user_prompt, plan, on_event, **flags)
 
 # Enhanced system prompt with new features
 
@@ -1017,7 +1688,9 @@ except UnicodeDecodeError:
 ENHANCED_SYSTEM_PROMPT = content
 
 # Initialize enhanced components
-agent = EnhancedFileAgent(system_prompt=ENHANCED_SYSTEM_PROMPT)
+# (grep_files process-pool workers are spawned, re-import this file as __mp_main__ and must not build an agent)
+if __name__ != "__mp_main__":
+    agent = EnhancedFileAgent(system_prompt=ENHANCED_SYSTEM_PROMPT)
 
 # FastAPI Setup
 app = FastAPI(title="Enhanced FileWise AI Agent")
@@ -1034,7 +1707,8 @@ app.add_middleware(
 
 class UserRequest(BaseModel):
     prompt: str
-    current_dir: str = "."
+    current_dir: Optional[str] = None
+    session_id: str = DEFAULT_SESSION_ID
     use_semantic: bool = True
 
 @app.get("/")
@@ -1047,19 +1721,139 @@ def home():
             "program_management",
             "internet_browsing", 
             "system_info",
-            "voice_recognition"
+            "voice_recognition",
+            "streaming_search"
         ],
         "status": "ok"
     }
 
+@app.get("/cache-stats")
+def cache_stats(session_id: str = DEFAULT_SESSION_ID):
+    """Cache hit/miss and eviction counters, local intent ratio and chat size (query, intent and plan stats are shared)"""
+    session = agent.sessions.find(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail={"error": f"No active session '{session_id}'"})
+    stats = session.memory.cache_stats()
+    stats["query_results"] = agent.query_cache.stats()
+    stats["local_intents"] = agent.intent_parser.stats()
+    stats["plans"] = agent.plan_cache.stats()
+    stats["chat"] = session.conversation.status()
+    return stats
+
+@app.get("/rate-limits")
+def rate_limits():
+    """Per-model quota use, queue depth and wait times of the Gemini scheduler, and router health"""
+    status = agent.rate_limiter.status()
+    status["router"] = agent.model.status()
+    return status
+
+@app.get("/sessions")
+def list_sessions():
+    return agent.sessions.status()
+
+@app.delete("/sessions/{session_id}")
+def end_session(session_id: str):
+    """Forget a client's chat and in-memory state (its journal stays for a later warm start)"""
+    return {"ended": agent.sessions.drop(session_id)}
+
+async def _run_for_client(http_request, coroutine, timeout):
+    """Await coroutine; cancel it when the client disconnects (returns None) or after timeout (504)"""
+    task = asyncio.ensure_future(coroutine)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(status_code=504, detail={"error": f"Request timed out after {timeout:g} seconds"})
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                return None
+    finally:
+        task.cancel()
+
 @app.post("/file-agent")
-def handle_request(request: UserRequest):
-    result = agent.process_request(request.prompt, request.current_dir)
+async def handle_request(request: UserRequest, http_request: Request):
+    result = await _run_for_client(
+        http_request,
+        agent.process_request_async(request.prompt, request.current_dir, session_id=request.session_id),
+        REQUEST_TIMEOUT_SECONDS,
+    )
+    if result is None:
+        # Nobody is left to read a body
+        return Response(status_code=499)
     print(result)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result)
     return result
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _stream_for_client(http_request, start, timeout):
+    """Yield (event, data) from start(on_event), a process_request_async call, ending with "result"
+
+    Events: "command" once the plan is known, "match" for every search hit as
+    the walker finds it, "step" after each workflow step, and a final "result"
+    carrying the same payload /file-agent returns. Stops and cancels the request when the client disconnects; after timeout
+    an "error" event is sent instead of the result. on_event runs on command
+    workers and returns True once the stream has stopped, which ends the
+    search walk and any remaining workflow steps.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    stopped = threading.Event()
+
+    def on_event(event, data):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+        return stopped.is_set()
+
+    task = asyncio.ensure_future(start(on_event))
+    # Queued behind the events the workers already posted
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    deadline = time.monotonic() + timeout
+    next_check = time.monotonic() + DISCONNECT_POLL_SECONDS
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                yield "error", {"error": f"Request timed out after {timeout:g} seconds"}
+                return
+            if now >= next_check:
+                next_check = now + DISCONNECT_POLL_SECONDS
+                if await http_request.is_disconnected():
+                    return
+            try:
+                item = await asyncio.wait_for(events.get(), min(DISCONNECT_POLL_SECONDS, deadline - now))
+            except asyncio.TimeoutError:
+                continue
+            if item is None:
+                break
+            yield item
+        if task.exception() is not None:
+            yield "error", {"error": str(task.exception())}
+        else:
+            yield "result", task.result()
+    finally:
+        stopped.set()
+        task.cancel()
+
+@app.post("/file-agent/stream")
+async def handle_stream_request(request: UserRequest, http_request: Request):
+    """Same as /file-agent, but streams search hits as Server-Sent Events while they are found"""
+    async def event_stream():
+        events = _stream_for_client(
+            http_request,
+            lambda on_event: agent.process_request_async(
+                request.prompt, request.current_dir, session_id=request.session_id, on_event=on_event
+            ),
+            REQUEST_TIMEOUT_SECONDS,
+        )
+        async for event, data in events:
+            yield _sse(event, data)
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8002)
\ No newline at end of file
@@ -0,0 +1,164 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA_VERSION = 2
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".filewise", "memory.db")
+# Compact after this many appends
+COMPACT_EVERY = 500
+# Interactions kept on disk per session; only the newest max_history are ever loaded
+KEEP_INTERACTIONS = 200
+# A session with no record newer than this (an abandoned client id) is dropped entirely
+KEEP_SESSION_SECONDS = 30 * 24 * 60 * 60
+
+
+class MemoryJournal:
+    """Append-only SQLite journal of conversation turns and cached searches
+
+    Every interaction and every cached search (including rewrites after
+    filesystem events) is appended as a JSON record, so a restart can rebuild
+    ConversationMemory from the newest records only. Each client session
+    reads and writes only its own records, but compaction covers every
+    session in the file: it drops superseded searches, searches older than
+    the cache TTL, interactions beyond KEEP_INTERACTIONS per session and
+    sessions idle for KEEP_SESSION_SECONDS, so ids that never come back do
+    not grow the file forever.
+    """
+
+    def __init__(self, db_path=DEFAULT_JOURNAL_PATH, session="default"):
+        self.db_path = db_path
+        self.session = session
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._appends = 0
+        self.compactions = 0
+
+    def _create_schema(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS journal")
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY,
+                    session TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    key TEXT,
+                    created REAL NOT NULL,
+                    payload TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS journal_session_kind_key ON journal(session, kind, key);
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+            self._conn.commit()
+
+    # -------------------- WRITING --------------------
+
+    def _append(self, kind, key, payload):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO journal(session, kind, key, created, payload) VALUES (?, ?, ?, ?, ?)",
+                (self.session, kind, key, time.time(), json.dumps(payload, default=str)),
+            )
+            self._conn.commit()
+            self._appends += 1
+
+    def append_interaction(self, interaction):
+        self._append("interaction", None, interaction)
+
+    def append_search(self, key, search_path, folders, files, timestamp):
+        """Record the current state of one cached search; later records supersede earlier ones"""
+        self._append("search", key, {
+            "search_path": search_path,
+            "folders": folders,
+            "files": files,
+            "timestamp": timestamp,
+        })
+
+    def should_compact(self):
+        return self._appends >= COMPACT_EVERY
+
+    def compact(self, max_age=None, keep_sessions=KEEP_SESSION_SECONDS):
+        """Drop everything a warm start of any session would never load"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                DELETE FROM journal WHERE session IN (
+                    SELECT session FROM journal GROUP BY session HAVING MAX(created) < ?
+                )
+            """, (now - keep_sessions,))
+            self._conn.execute("""
+                DELETE FROM journal WHERE kind = 'search' AND seq NOT IN (
+                    SELECT MAX(seq) FROM journal WHERE kind = 'search' GROUP BY session, key
+                )
+            """)
+            if max_age:
+                self._conn.execute(
+                    "DELETE FROM journal WHERE kind = 'search' AND created < ?", (now - max_age,)
+                )
+            self._conn.execute("""
+                DELETE FROM journal WHERE kind = 'interaction' AND seq IN (
+                    SELECT seq FROM (
+                        SELECT seq, ROW_NUMBER() OVER (PARTITION BY session ORDER BY seq DESC) AS newer
+                        FROM journal WHERE kind = 'interaction'
+                    ) WHERE newer > ?
+                )
+            """, (KEEP_INTERACTIONS,))
+            self._conn.commit()
+            self._appends = 0
+            self.compactions += 1
+
+    # -------------------- READING --------------------
+
+    def recent_interactions(self, limit):
+        """The newest `limit` interactions, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM journal WHERE session = ? AND kind = 'interaction' ORDER BY seq DESC LIMIT ?",
+                (self.session, int(limit)),
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(rows)]
+
+    def recent_searches(self, limit, max_age=None):
+        """Latest record of the `limit` most recently cached searches, least recent first"""
+        sql = (
+            "SELECT key, payload FROM journal WHERE seq IN ("
+            " SELECT MAX(seq) FROM journal WHERE session = ? AND kind = 'search' GROUP BY key"
+            ")"
+        )
+        args = [self.session]
+        if max_age:
+            sql += " AND created >= ?"
+            args.append(time.time() - max_age)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [(key, json.loads(payload)) for key, payload in reversed(rows)]
+
+    def status(self):
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT kind, COUNT(*) FROM journal WHERE session = ? GROUP BY kind", (self.session,)
+            ).fetchall())
+        db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {
+            "journal_path": self.db_path,
+            "session": self.session,
+            "interactions": counts.get("interaction", 0),
+            "search_records": counts.get("search", 0),
+            "appends_since_compaction": self._appends,
+            "compactions": self.compactions,
+            "journal_size_mb": round(db_size / (1024 * 1024), 2),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
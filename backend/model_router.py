@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+
+from context_builder import estimate_tokens
+from rate_limiter import PENALTY_SECONDS, QuotaExceeded, RESPONSE_TOKENS, is_rate_limit_error
+
+# Seconds allowed for one model call before it is abandoned for the next model
+DEFAULT_TIMEOUT = 30.0
+# Weight of the newest call in the latency average
+LATENCY_ALPHA = 0.3
+# Assumed latency of a model that has not answered yet
+UNMEASURED_LATENCY = 1.5
+# A model below this share of its daily quota is only used when the others are busier
+DAILY_RESERVE = 0.1
+RESERVE_PENALTY = 30.0
+# Cooldown after consecutive failures doubles from the first value up to the second
+COOLDOWN_SECONDS = (5.0, 300.0)
+
+
+def is_transient_error(error):
+    """Timeouts and server-side failures that another model may not have"""
+    return type(error).__name__ in (
+        "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "TimeoutError", "RetryError",
+    ) or isinstance(error, TimeoutError)
+
+
+class ModelHealth:
+    """Latency average and failure streak of one model"""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.streak = 0
+        self.latency = None
+        self.cooling_until = 0.0
+        self.last_error = None
+
+    def succeeded(self, latency):
+        self.requests += 1
+        self.streak = 0
+        self.latency = latency if self.latency is None else (1 - LATENCY_ALPHA) * self.latency + LATENCY_ALPHA * latency
+
+    def failed(self, error, cooldown=None):
+        self.requests += 1
+        self.failures += 1
+        self.streak += 1
+        first, longest = COOLDOWN_SECONDS
+        cooldown = cooldown if cooldown is not None else min(longest, first * 2 ** (self.streak - 1))
+        self.cooling_until = time.monotonic() + cooldown
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+
+    def status(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "cooling_down_seconds": round(max(0.0, self.cooling_until - time.monotonic()), 1),
+            "last_error": self.last_error,
+        }
+
+
+class RoutedChat:
+    """ChatSession stand-in whose every message may be answered by a different model
+
+    The history is kept as plain dicts; when the router picks another model
+    than the last call used, that model's chat is started from it.
+    """
+
+    def __init__(self, router, history):
+        self.router = router
+        self.history = list(history)
+        self._tokens = sum(estimate_tokens(part) for item in self.history for part in item["parts"])
+        self._model = None
+        self._chat = None
+        self.last_model = None
+
+    def session_for(self, name):
+        if name != self._model:
+            self._chat = self.router.models[name].start_chat(history=self.history)
+            self._model = name
+        return self._chat
+
+    def discard_session(self):
+        # A failed call may leave the SDK's copy of the history half updated
+        self._model = self._chat = None
+
+    def _record(self, message, response):
+        self.history += [
+            {"role": "user", "parts": [message]},
+            {"role": "model", "parts": [response.text]},
+        ]
+        self._tokens += estimate_tokens(message) + estimate_tokens(response.text)
+
+    async def send_message_async(self, message):
+        tokens = self._tokens + estimate_tokens(message) + RESPONSE_TOKENS
+        response, self.last_model = await self.router.send_async(self, message, tokens)
+        self._record(message, response)
+        return response
+
+
+class _Attempt:
+    """Models already tried, errors seen and the queueing budget of one routed call"""
+
+    def __init__(self, router, tokens):
+        self.router = router
+        self.tokens = tokens
+        self.tried = []
+        self.name = None
+        self.last_error = None
+        self.retry_after = []
+        # One queueing budget for the whole call, however many models it tries
+        self.deadline = time.monotonic() + router.scheduler.max_wait
+
+    def next_model(self):
+        ranked = self.router.rank(self.tokens, exclude=self.tried)
+        if not ranked:
+            return False
+        self.name = ranked[0][0]
+        self.tried.append(self.name)
+        if len(self.tried) > 1:
+            with self.router._lock:
+                self.router.failovers += 1
+        return True
+
+    def budget(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def shed(self, error):
+        self.last_error = error
+        if error.retry_after:
+            self.retry_after.append(error.retry_after)
+
+    def exhausted(self):
+        now = time.monotonic()
+        with self.router._lock:
+            cooling = [h.cooling_until - now for h in self.router.health.values() if h.cooling_until > now]
+        waits = self.retry_after + cooling
+        return QuotaExceeded(f"No model could take the request (last error: {self.last_error})",
+                             retry_after=min(waits) if waits else None)
+
+
+class ModelRouter:
+    """Spread Gemini calls over several models by quota headroom and measured latency
+
+    Looks like a GenerativeModel to BoundedChat: start_chat() returns a
+    RoutedChat. For each call the healthy models are ranked by expected time
+    to an answer, the scheduler's wait for quota plus the model's average
+    latency, with models near their daily quota ranked last. A shed call,
+    a 429, a timeout or a server error moves on to the next model; only when
+    every model has failed does the error reach the caller.
+    """
+
+    def __init__(self, model_factory, model_names, scheduler, timeout=DEFAULT_TIMEOUT):
+        self.model_names = list(model_names)
+        self.models = {name: model_factory(name) for name in self.model_names}
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.health = {name: ModelHealth() for name in self.model_names}
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def start_chat(self, history=None):
+        return RoutedChat(self, history or [])
+
+    def rank(self, tokens, exclude=()):
+        """Model names best first, with the expected seconds to an answer"""
+        now = time.monotonic()
+        with self._lock:
+            measured = [h.latency for h in self.health.values() if h.latency is not None]
+            default_latency = sorted(measured)[len(measured) // 2] if measured else UNMEASURED_LATENCY
+            ranked = []
+            for order, name in enumerate(self.model_names):
+                health = self.health[name]
+                if name in exclude or health.cooling_until > now:
+                    continue
+                wait = self.scheduler.estimate_wait(name, tokens)
+                if wait is None:
+                    continue
+                score = wait + (health.latency if health.latency is not None else default_latency)
+                if self.scheduler.daily_headroom(name) < DAILY_RESERVE:
+                    score += RESERVE_PENALTY
+                # Ties go to the earlier model in the configured order
+                ranked.append((score, order, name))
+        return [(name, score) for score, _, name in sorted(ranked)]
+
+    async def send_async(self, chat, message, tokens):
+        """(response, model name) from the first model that answers, awaited without holding a thread"""
+        attempt = _Attempt(self, tokens)
+        while attempt.next_model():
+            name = attempt.name
+            try:
+                await self.scheduler.acquire_async(name, tokens, max_wait=attempt.budget())
+            except QuotaExceeded as e:
+                attempt.shed(e)
+                continue
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    chat.session_for(name).send_message_async(message, request_options={"timeout": self.timeout}),
+                    self.timeout,
+                )
+            except Exception as e:
+                self._failed(chat, name, e)
+                attempt.last_error = e
+                continue
+            self._succeeded(name, started, tokens, response)
+            return response, name
+        raise attempt.exhausted()
+
+    def _failed(self, chat, name, error):
+        """Record a failed call, or re-raise it when another model would fail the same way"""
+        chat.discard_session()
+        if is_rate_limit_error(error):
+            self.scheduler.penalize(name)
+            cooldown = PENALTY_SECONDS
+        elif is_transient_error(error):
+            cooldown = None
+        else:
+            raise error
+        with self._lock:
+            self.health[name].failed(error, cooldown)
+
+    def _succeeded(self, name, started, tokens, response):
+        with self._lock:
+            self.health[name].succeeded(time.monotonic() - started)
+        usage = getattr(response, "usage_metadata", None)
+        self.scheduler.settle(name, tokens, getattr(usage, "total_token_count", None))
+
+    def status(self):
+        with self._lock:
+            health = {name: self.health[name].status() for name in self.model_names}
+        return {"models": self.model_names, "failovers": self.failovers, "health": health}
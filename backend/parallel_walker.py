@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+DEFAULT_THREADS = min(16, (os.cpu_count() or 4) * 2)
+
+WalkEntry = namedtuple("WalkEntry", ["path", "name", "is_dir", "depth", "stat"])
+
+
+class ParallelWalker:
+    """Work-stealing multi-threaded directory walker built on os.scandir
+
+    Every worker owns a deque of directories: it pops its own newest work (depth
+    first, cache friendly) and steals the oldest work of other workers when it
+    runs dry, which keeps all threads busy on lopsided trees. Entries are
+    streamed back as each directory is read, so callers see the first match
+    long before the walk is finished.
+    """
+
+    def __init__(self, threads=DEFAULT_THREADS, on_error=None):
+        self.threads = max(1, int(threads))
+        self.on_error = on_error
+
+    def walk(self, root, descend=None, with_stat=False, threads=None, ignore=None, on_error=None, deadline=None):
+        """Yield a WalkEntry for everything below root, in no particular order
+
+        descend(path, name, depth) can return False to prune a directory;
+        ignore(path, name, is_dir) returning True drops an entry and, for a
+        directory, its whole subtree. with_stat fills WalkEntry.stat from the
+        worker thread (lstat semantics). on_error(OSError) overrides the
+        walker's own handler for this walk. Closing the generator early stops
+        the workers. Past deadline (a time.monotonic() value) the walk raises
+        TimeoutError, even while every worker is stuck in a scandir that never
+        returns (a stalled network share); those threads are abandoned.
+        """
+        on_error = on_error or self.on_error
+        root = os.path.abspath(root)
+        workers = max(1, int(threads or self.threads))
+        deques = [deque() for _ in range(workers)]
+        deques[0].append((root, 0))
+        results = queue.Queue()
+        idle = threading.Condition()
+        state = {"pending": 1}
+        cancel = threading.Event()
+
+        def next_item(index):
+            try:
+                return deques[index].pop()
+            except IndexError:
+                pass
+            for offset in range(1, workers):
+                try:
+                    return deques[(index + offset) % workers].popleft()
+                except IndexError:
+                    continue
+            return None
+
+        def worker(index):
+            try:
+                while not cancel.is_set():
+                    item = next_item(index)
+                    if item is None:
+                        with idle:
+                            if state["pending"] == 0:
+                                idle.notify_all()
+                                return
+                            idle.wait(0.005)
+                        continue
+
+                    batch, subdirs = self._scan(item[0], item[1], descend, with_stat, ignore, on_error)
+                    with idle:
+                        # Count new work before publishing it so pending never hits zero early
+                        state["pending"] += len(subdirs)
+                    deques[index].extend(subdirs)
+                    with idle:
+                        state["pending"] -= 1
+                        if subdirs or state["pending"] == 0:
+                            idle.notify_all()
+                    if batch:
+                        results.put(batch)
+            finally:
+                results.put(None)
+
+        pool = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+        for thread in pool:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < workers:
+                if deadline is None:
+                    batch = results.get()
+                else:
+                    try:
+                        batch = results.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        raise TimeoutError(f"Walk of '{root}' passed its deadline") from None
+                if batch is None:
+                    finished += 1
+                    continue
+                yield from batch
+        finally:
+            cancel.set()
+
+    def _scan(self, directory, depth, descend, with_stat, ignore, on_error=None):
+        batch = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if ignore is not None and ignore(entry.path, entry.name, is_dir):
+                            continue
+                        stat = entry.stat(follow_symlinks=False) if with_stat else None
+                    except OSError as e:
+                        if on_error:
+                            on_error(e)
+                        continue
+                    batch.append(WalkEntry(entry.path, entry.name, is_dir, depth + 1, stat))
+                    if is_dir and (descend is None or descend(entry.path, entry.name, depth + 1)):
+                        subdirs.append((entry.path, depth + 1))
+        except OSError as e:
+            if on_error:
+                on_error(e)
+        return batch, subdirs
+
+    def directory_size(self, root):
+        """Total size in bytes and item counts for everything below root"""
+        total = files = folders = 0
+        for entry in self.walk(root, with_stat=True):
+            if entry.is_dir:
+                folders += 1
+            else:
+                files += 1
+                total += entry.stat.st_size
+        return {"size_bytes": total, "file_count": files, "folder_count": folders}
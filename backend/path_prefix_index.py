@@ -0,0 +1,65 @@
+import bisect
+import os
+import threading
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class PathPrefixIndex:
+    """Sorted (path, key) pairs answering "which keys belong to this folder or below"
+
+    A lookup bisects to the entry for the folder itself and then to the block of
+    entries that start with folder + separator, so it only visits matches and a
+    sibling such as "/docs2" never matches "/docs".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, path, key):
+        item = (_normalize(path), key)
+        with self._lock:
+            position = bisect.bisect_left(self._items, item)
+            if position == len(self._items) or self._items[position] != item:
+                self._items.insert(position, item)
+
+    def remove(self, path, key):
+        item = (_normalize(path), key)
+        with self._lock:
+            position = bisect.bisect_left(self._items, item)
+            if position < len(self._items) and self._items[position] == item:
+                del self._items[position]
+
+    def at(self, path):
+        """Keys registered for exactly this path"""
+        path = _normalize(path)
+        with self._lock:
+            keys = []
+            position = bisect.bisect_left(self._items, (path,))
+            while position < len(self._items) and self._items[position][0] == path:
+                keys.append(self._items[position][1])
+                position += 1
+            return keys
+
+    def under(self, root):
+        """Keys registered for root or any path below it"""
+        root = _normalize(root)
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        with self._lock:
+            keys = []
+            position = bisect.bisect_left(self._items, (root,))
+            while prefix != root and position < len(self._items) and self._items[position][0] == root:
+                keys.append(self._items[position][1])
+                position += 1
+            # Separator-prefixed block; "root2" or "root x" sort outside it
+            position = bisect.bisect_left(self._items, (prefix,))
+            while position < len(self._items) and self._items[position][0].startswith(prefix):
+                keys.append(self._items[position][1])
+                position += 1
+            return keys
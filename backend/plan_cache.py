@@ -0,0 +1,78 @@
+import copy
+import hashlib
+import os
+import re
+import threading
+
+from bounded_cache import BoundedCache
+from intent_parser import normalize
+
+DEFAULT_TTL = 600
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+# Plans that only read, or leave the same state however often they run
+REPLAYABLE_COMMANDS = {
+    "list_directory", "read_file", "search_item", "search_content", "grep_files", "find_files",
+    "semantic_search", "index_status", "get_ignore_rules", "get_directory_size", "get_system_info",
+    "get_current_time", "get_location", "get_weather", "list_running_programs",
+    "rebuild_index", "index_content", "build_semantic_index",
+}
+# Words that point back into the conversation; the plan then depends on it
+_REFERRING = re.compile(r"\b(?:it|its|that|those|them|these|they|again|same|previous|last|above|there|ones?)\b")
+
+
+def is_replayable(plan):
+    """True when every command of the plan (or of its workflow) is read-only or idempotent"""
+    if not isinstance(plan, dict):
+        return False
+    steps = plan.get("workflow") if "workflow" in plan else [plan]
+    return bool(steps) and all(isinstance(step, dict) and step.get("command") in REPLAYABLE_COMMANDS for step in steps)
+
+
+class PlanCache:
+    """The model's command JSON for recently seen prompts, replayed without a Gemini call
+
+    Keys are the normalized prompt, the working directory and, only when
+    the prompt refers back to the conversation ("open it again"), a hash of
+    the context sent with it. Only replayable plans are stored; the plan is
+    executed afresh on every hit, so results are never stale.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self._cache = BoundedCache(max_bytes, default_ttl=ttl, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.ineligible = 0
+
+    @staticmethod
+    def key(prompt, current_dir, context=""):
+        text = normalize(prompt).lower()
+        context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest() if _REFERRING.search(text) else ""
+        directory = os.path.normcase(os.path.abspath(current_dir or "."))
+        return "\0".join((text, directory, context_hash))
+
+    def get(self, key):
+        plan = self._cache.get(key)
+        # Commands get their parameters mutated on the way to execution
+        return copy.deepcopy(plan) if plan is not None else None
+
+    def put(self, key, plan):
+        if not is_replayable(plan):
+            with self._lock:
+                self.ineligible += 1
+            return False
+        stored = self._cache.set(key, copy.deepcopy(plan))
+        if stored:
+            with self._lock:
+                self.stored += 1
+        return stored
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["stored"] = self.stored
+        stats["ineligible"] = self.ineligible
+        return stats
@@ -0,0 +1,103 @@
+import os
+import threading
+
+from bounded_cache import BoundedCache
+from path_prefix_index import PathPrefixIndex
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _root(key):
+    return key.split("\0", 1)[0]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class QueryCache:
+    """Recent name-search results keyed on their normalized parameters
+
+    Each entry carries what proves it is still current. Results served from
+    the filename index are dropped by watcher events at or above their root,
+    because the index itself only changes through those events. Results from a
+    directory walk keep the mtime of every folder the walk listed and are
+    re-checked on lookup: a folder's mtime moves whenever a name inside it is
+    added, removed or renamed.
+    """
+
+    def __init__(self, max_bytes, ttl=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self._cache = BoundedCache(max_bytes, default_ttl=ttl, max_entries=max_entries, on_evict=self._on_evict)
+        self._roots = PathPrefixIndex()
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    @staticmethod
+    def key(search_path, keyword, search_type, max_results, max_depth, include_ignored):
+        # NUL cannot appear in a path, so the root is always the first field
+        parts = (_normalize(search_path), " ".join(keyword.lower().split()), search_type,
+                 max_results, max_depth, bool(include_ignored))
+        return "\0".join(str(part) for part in parts)
+
+    def get(self, key):
+        """The cached {"files", "folders", "truncated_reason"} for key, or None when missing or stale"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry["dir_mtimes"] is not None:
+            for directory, mtime in entry["dir_mtimes"].items():
+                if _mtime(directory) != mtime:
+                    self._drop(key)
+                    return None
+        return entry
+
+    def put(self, key, files, folders, truncated_reason=None, dir_mtimes=None):
+        """Store a result; dir_mtimes is None when watcher events keep it current"""
+        stored = self._cache.set(key, {
+            "files": list(files),
+            "folders": list(folders),
+            "truncated_reason": truncated_reason,
+            "dir_mtimes": dir_mtimes,
+        })
+        if stored:
+            self._roots.add(_root(key), key)
+
+    def invalidate(self, path):
+        """Drop every result that could include path: searches rooted at it, above it or below it"""
+        path = _normalize(path)
+        keys = set(self._roots.under(path))
+        parent = os.path.dirname(path)
+        while parent != path:
+            keys.update(self._roots.at(parent))
+            path, parent = parent, os.path.dirname(parent)
+        for key in keys:
+            self._drop(key)
+
+    def invalidate_under(self, root):
+        for key in self._roots.under(root):
+            self._drop(key)
+
+    def _drop(self, key):
+        if self._cache.pop(key) is not None:
+            self._roots.remove(_root(key), key)
+            with self._lock:
+                self.invalidations += 1
+
+    def _on_evict(self, key, value):
+        self._roots.remove(_root(key), key)
+
+    def clear(self):
+        self._cache.clear()
+        self._roots = PathPrefixIndex()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
@@ -0,0 +1,273 @@
+import asyncio
+import datetime
+import threading
+import time
+from collections import deque
+
+# Free-tier limits per model: (requests per minute, tokens per minute, requests per day)
+MODEL_QUOTAS = {
+    "gemini-2.5-pro": (5, 250_000, 100),
+    "gemini-2.5-flash": (10, 250_000, 250),
+    "gemini-2.5-flash-lite": (15, 250_000, 1000),
+    "gemini-2.0-flash": (15, 1_000_000, 200),
+    "gemini-2.0-flash-lite": (30, 1_000_000, 200),
+}
+# The free tier counts requests and tokens over a rolling minute
+WINDOW_SECONDS = 60.0
+# Longest a request queues for its model before it is shed
+DEFAULT_MAX_WAIT = 20.0
+DEFAULT_MAX_QUEUE = 32
+# Added to the prompt estimate for the model's answer
+RESPONSE_TOKENS = 300
+# How long a model is left alone after it answers 429 itself
+PENALTY_SECONDS = 30.0
+# Queued callers re-check their turn at least this often
+ASYNC_POLL_SECONDS = 0.05
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database (Windows without tzdata): Pacific standard time is close enough
+    QUOTA_TIMEZONE = datetime.timezone(datetime.timedelta(hours=-8))
+
+
+class QuotaExceeded(Exception):
+    """A request was shed instead of being sent into a certain 429"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit_error(error):
+    """True for the API's own 429 (google.api_core ResourceExhausted), without importing api_core"""
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests") or "429" in str(error)
+
+
+class SlidingWindow:
+    """Log of what was spent in the last `window` seconds, so no rolling window ever exceeds `limit`
+
+    Unlike a bucket that refills at limit/window, the whole limit is usable:
+    a call waits only until enough of the oldest spending has aged out.
+    """
+
+    def __init__(self, limit, window=WINDOW_SECONDS):
+        self.limit = float(limit)
+        self.window = window
+        # (time, amount), oldest first
+        self._log = deque()
+        self._used = 0.0
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self):
+        """Sustained allowance per second"""
+        return self.limit / self.window
+
+    def _expire(self, now):
+        while self._log and self._log[0][0] <= now - self.window:
+            self._used -= self._log.popleft()[1]
+
+    def wait_time(self, amount, now):
+        self._expire(now)
+        # Larger than the limit: wait for an empty window rather than forever
+        excess = self._used + min(amount, self.limit) - self.limit
+        wait = max(0.0, self.blocked_until - now)
+        for spent_at, spent in self._log:
+            if excess <= 0:
+                break
+            excess -= spent
+            wait = max(wait, spent_at + self.window - now)
+        return wait
+
+    def available(self, now):
+        self._expire(now)
+        return 0.0 if now < self.blocked_until else self.limit - self._used
+
+    def take(self, amount, now):
+        """Spend amount; a negative amount refunds an overestimate from the newest spending"""
+        self._expire(now)
+        if amount >= 0:
+            self._log.append((now, amount))
+            self._used += amount
+            return
+        refund = -amount
+        for i in range(len(self._log) - 1, -1, -1):
+            if refund <= 0:
+                break
+            spent_at, spent = self._log[i]
+            back = min(spent, refund)
+            self._log[i] = (spent_at, spent - back)
+            self._used -= back
+            refund -= back
+
+    def block(self, now, seconds):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class ModelQuota:
+    """Buckets, daily count, queue and wait statistics of one model"""
+
+    def __init__(self, rpm, tpm, rpd):
+        self.rpm, self.tpm, self.rpd = rpm, tpm, rpd
+        self.requests = SlidingWindow(rpm)
+        self.tokens = SlidingWindow(tpm)
+        self.day = None
+        self.used_today = 0
+        self.waiting = deque()
+        self.granted = 0
+        self.shed = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def remaining_today(self):
+        today = datetime.datetime.now(QUOTA_TIMEZONE).date()
+        if today != self.day:
+            # The daily quota resets at midnight Pacific time
+            self.day, self.used_today = today, 0
+        return self.rpd - self.used_today
+
+    def wait_time(self, tokens, now):
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def status(self, now):
+        return {
+            "limits": {"rpm": self.rpm, "tpm": self.tpm, "rpd": self.rpd},
+            "requests_available": round(max(0.0, self.requests.available(now)), 2),
+            "tokens_available": int(max(0.0, self.tokens.available(now))),
+            "used_today": self.used_today,
+            "remaining_today": self.remaining_today(),
+            "queue_depth": len(self.waiting),
+            "granted": self.granted,
+            "shed": self.shed,
+            "rate_limited_by_api": self.rate_limited,
+            "avg_wait_seconds": round(self.total_wait / self.granted, 3) if self.granted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+
+class RateLimitScheduler:
+    """Queue Gemini calls per model so they stay inside its RPM, TPM and RPD quota
+
+    acquire_async() waits until the model's request and token windows both
+    have room, serving callers first come first served. It sheds the call with
+    QuotaExceeded instead when the daily quota is used up, the queue is full,
+    or the wait would pass max_wait. Models missing from the quota table are
+    not limited.
+    """
+
+    def __init__(self, quotas=None, max_wait=DEFAULT_MAX_WAIT, max_queue=DEFAULT_MAX_QUEUE):
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._models = {name: ModelQuota(*limits) for name, limits in (quotas or MODEL_QUOTAS).items()}
+
+    def _quota(self, model):
+        return self._models.get(model.lower().rsplit("/", 1)[-1])
+
+    async def acquire_async(self, model, tokens, max_wait=None):
+        """Wait for room to send `tokens` (prompt plus history estimate) to model; leaves the queue when cancelled"""
+        quota = self._quota(model)
+        if quota is None:
+            return
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        with self._lock:
+            ticket = self._enqueue(quota, model)
+        try:
+            while True:
+                with self._lock:
+                    granted, sleep = self._step(quota, model, ticket, tokens, deadline)
+                if granted:
+                    return
+                await asyncio.sleep(min(sleep, ASYNC_POLL_SECONDS))
+        finally:
+            with self._lock:
+                self._leave(quota, ticket)
+
+    def _enqueue(self, quota, model):
+        if quota.remaining_today() <= 0:
+            quota.shed += 1
+            raise QuotaExceeded(f"The daily request quota for {model} is used up")
+        if len(quota.waiting) >= self.max_queue:
+            quota.shed += 1
+            raise QuotaExceeded(f"Too many requests are queued for {model}", retry_after=self.max_wait)
+        ticket = (object(), time.monotonic())
+        quota.waiting.append(ticket)
+        return ticket
+
+    def _step(self, quota, model, ticket, tokens, deadline):
+        """(True, 0) once the call is granted and charged, else (False, seconds to sleep); raises when shed"""
+        now = time.monotonic()
+        if quota.waiting[0] is not ticket:
+            if now >= deadline:
+                quota.shed += 1
+                raise QuotaExceeded(f"{model} is at its rate limit", retry_after=deadline - ticket[1])
+            return False, deadline - now
+        if quota.remaining_today() <= 0:
+            quota.shed += 1
+            raise QuotaExceeded(f"The daily request quota for {model} is used up")
+        wait = quota.wait_time(tokens, now)
+        if wait > 0:
+            if now + wait > deadline:
+                quota.shed += 1
+                raise QuotaExceeded(f"{model} is at its rate limit", retry_after=wait)
+            return False, wait
+        quota.requests.take(1, now)
+        quota.tokens.take(tokens, now)
+        quota.used_today += 1
+        quota.granted += 1
+        waited = now - ticket[1]
+        quota.total_wait += waited
+        quota.max_wait = max(quota.max_wait, waited)
+        return True, 0.0
+
+    def _leave(self, quota, ticket):
+        quota.waiting.remove(ticket)
+
+    def estimate_wait(self, model, tokens):
+        """Seconds until a call of `tokens` could start, queue included; None when the daily quota is used up"""
+        quota = self._quota(model)
+        if quota is None:
+            return 0.0
+        with self._lock:
+            if quota.remaining_today() <= 0:
+                return None
+            # Everyone queued ahead needs at least one request token
+            ahead = len(quota.waiting) / quota.requests.rate
+            return quota.wait_time(tokens, time.monotonic()) + ahead
+
+    def daily_headroom(self, model):
+        """Share of today's request quota still unused (1.0 for unlimited models)"""
+        quota = self._quota(model)
+        if quota is None:
+            return 1.0
+        with self._lock:
+            return quota.remaining_today() / quota.rpd
+
+    def settle(self, model, estimated, actual):
+        """Charge (or refund) the difference once the real token count is known"""
+        quota = self._quota(model)
+        if quota is None or actual is None:
+            return
+        with self._lock:
+            quota.tokens.take(actual - estimated, time.monotonic())
+
+    def penalize(self, model, seconds=PENALTY_SECONDS):
+        """The API answered 429 anyway (another client shares the key): hold the model back"""
+        quota = self._quota(model)
+        if quota is None:
+            return
+        with self._lock:
+            quota.requests.block(time.monotonic(), seconds)
+            quota.rate_limited += 1
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "max_wait_seconds": self.max_wait,
+                "max_queue": self.max_queue,
+                "models": {name: quota.status(now) for name, quota in self._models.items()},
+            }
@@ -0,0 +1,65 @@
+import re
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+def name_terms(text):
+    """Lowercase word terms, the unit both the vectorizer and the heuristic compare"""
+    return re.findall(r"\w+", text.lower())
+
+
+class NgramMatcher:
+    """Character n-gram vectors of cached file names, one sparse matrix per cached search
+
+    The vectorizer is a stateless HashingVectorizer, so a search's vectors
+    are built once when it is cached and stored in the same cache entry: they
+    count towards its byte budget and are evicted with it, and nothing is
+    refitted over the other searches. Rows are float32 and L2-normalised, so
+    scoring a query against a search is one sparse matrix-vector product, and
+    the top-k come from np.argpartition instead of a sort. Names are read
+    straight from each search's FileTable.
+    """
+
+    def __init__(self, ngram_range=(2, 4), n_features=2 ** 18):
+        self._vectorizer = HashingVectorizer(
+            analyzer="char_wb", ngram_range=ngram_range, n_features=n_features, alternate_sign=False,
+            dtype=np.float32,
+        )
+
+    def _vectors(self, texts):
+        return self._vectorizer.transform(" ".join(name_terms(text)) for text in texts)
+
+    def vectorize(self, table):
+        """(sparse matrix, path hashes) with one row per table row, for storing next to the table"""
+        if not len(table):
+            return None
+        path_ids = np.fromiter((hash(path) for path in table.paths()), dtype=np.int64, count=len(table))
+        return self._vectors(table.stems()), path_ids
+
+    def top_k(self, query, groups, k):
+        """Return up to k (file_info, cosine) pairs from (FileTable, vectors) groups, best first"""
+        groups = [(table, vectors) for table, vectors in groups if len(table)]
+        if not groups:
+            return []
+        query_vector = self._vectors([query]).T
+        tables, scores, path_ids = [], [], []
+        for table, (matrix, ids) in groups:
+            tables.append(table)
+            scores.append((matrix @ query_vector).toarray().ravel())
+            path_ids.append(ids)
+        owner = np.repeat(np.arange(len(tables)), [len(s) for s in scores])
+        starts = np.cumsum([0] + [len(s) for s in scores])
+        scores = np.concatenate(scores)
+
+        # A file cached under several searches is scored once: keep the first row of each path
+        _, first = np.unique(np.concatenate(path_ids), return_index=True)
+        candidates = first[scores[first] > 0]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        best = candidates[np.argsort(scores[candidates], kind="stable")[::-1]]
+        results = []
+        for i in best:
+            row = int(i - starts[owner[i]])
+            results.append((tables[owner[i]].info(row), float(scores[i])))
+        return results
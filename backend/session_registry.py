@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+DEFAULT_SESSION_ID = "default"
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+DEFAULT_MAX_SESSIONS = 64
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AgentSession:
+    """Per-client state: Gemini chat, conversation memory and working directory"""
+
+    def __init__(self, session_id, conversation, memory, current_dir="."):
+        self.session_id = session_id
+        self.conversation = conversation
+        self.memory = memory
+        self.current_dir = current_dir
+        # One turn at a time per session; different sessions run in parallel.
+        # Holders from threads and from the event loop share it, so it is a
+        # thread lock; release() wakes requests waiting in acquire_async().
+        self.lock = threading.Lock()
+        self._waiters = []
+        self._waiters_lock = threading.Lock()
+        # Set by close_when_idle() while a request holds the lock; the last release() runs it
+        self._on_idle = None
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.requests = 0
+
+    async def acquire_async(self):
+        """Take the lock from the event loop; the wait is a future resolved by release(), not a poll"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._waiters_lock:
+                if self.lock.acquire(blocking=False):
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._waiters_lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def release(self):
+        """Release the lock (from any thread) and wake every async waiter to retry"""
+        with self._waiters_lock:
+            waiters, self._waiters = self._waiters, []
+            on_idle = None if waiters else self._on_idle
+            if on_idle is not None:
+                self._on_idle = None
+        if on_idle is not None:
+            # Still holding the lock, so no request starts on a session being closed
+            on_idle()
+        self.lock.release()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def close_when_idle(self, callback):
+        """Run callback now if no request holds the session, else when the last one releases it"""
+        with self._waiters_lock:
+            if not self.lock.acquire(blocking=False):
+                self._on_idle = callback
+                return
+        self._on_idle = callback
+        self.release()
+
+    def status(self):
+        return {
+            "session_id": self.session_id,
+            "current_dir": self.current_dir,
+            "requests": self.requests,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "busy": self.lock.locked(),
+            "chat": self.conversation.status(),
+        }
+
+
+class SessionRegistry:
+    """Sessions keyed by client id, created on first use and evicted when idle
+
+    factory(session_id) builds a new AgentSession. Sessions idle for longer
+    than idle_timeout are dropped on the next lookup; past max_sessions the
+    least recently used idle session goes first. A session that is busy is
+    never evicted. on_evict(session) can release resources; for a session
+    dropped while a request still holds it, it runs once that request ends.
+    """
+
+    def __init__(self, factory, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_sessions=DEFAULT_MAX_SESSIONS, on_evict=None):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.on_evict = on_evict
+        # Reentrant: factory and on_evict run under it and may list the sessions
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self.evictions = 0
+
+    def get(self, session_id=DEFAULT_SESSION_ID):
+        session_id = session_id or DEFAULT_SESSION_ID
+        with self._lock:
+            self._sweep()
+            session = self._sessions.get(session_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict_lru()
+                session = self._sessions[session_id] = self.factory(session_id)
+            session.last_used = time.monotonic()
+            return session
+
+    def find(self, session_id=DEFAULT_SESSION_ID):
+        """The session if it exists; unlike get() it never creates one or counts as use"""
+        with self._lock:
+            return self._sessions.get(session_id or DEFAULT_SESSION_ID)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._close(session)
+        return session is not None
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.evictions += 1
+        self._close(session)
+
+    def _close(self, session):
+        if self.on_evict:
+            session.close_when_idle(lambda: self.on_evict(session))
+
+    def _sweep(self):
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used > self.idle_timeout and not session.lock.locked():
+                self._evict(session_id)
+
+    def _evict_lru(self):
+        idle = [s for s in self._sessions.values() if not s.lock.locked()]
+        if idle:
+            self._evict(min(idle, key=lambda s: s.last_used).session_id)
+
+    def status(self):
+        with self._lock:
+            self._sweep()
+            sessions = [session.status() for session in self._sessions.values()]
+        return {
+            "active_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout_seconds": self.idle_timeout,
+            "evictions": self.evictions,
+            "sessions": sessions,
+        }
@@ -0,0 +1,141 @@
+import sys
+from array import array
+from bisect import bisect_left
+
+# Once the candidate set is this small it is cheaper to verify names directly
+# than to keep intersecting posting lists
+VERIFY_THRESHOLD = 64
+# Removed entries are reclaimed once they are this share of all slots (and at least COMPACT_MIN_DEAD)
+COMPACT_RATIO = 0.25
+COMPACT_MIN_DEAD = 1024
+
+
+def trigrams(text):
+    """Return the set of 3-character substrings of an already-lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """In-memory trigram posting lists over lowercased basenames
+
+    Names live in one UTF-8 byte buffer addressed by offsets, and every posting
+    list is an array('I') of slot numbers, so an entry costs a few dozen bytes
+    instead of a Python string per name plus a list of ints per trigram.
+    Removing an entry only tombstones its slot; once tombstones pass
+    COMPACT_RATIO of the slots the live entries are copied into fresh
+    buffers and posting lists, so memory follows the live count under
+    create/delete churn.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array('I', [0])
+        self._entry_ids = array('I')
+        self._is_dir = bytearray()
+        self._alive = bytearray()
+        self._postings = {}
+        # entry id -> slot of its live entry
+        self._slot_of = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, entry_id, name, is_dir=False):
+        """Index one name; entry_id is the caller's key for it (a non-negative database row id)"""
+        if entry_id in self._slot_of:
+            self.remove(entry_id)
+        lowered = name.lower()
+        slot = len(self._entry_ids)
+        self._buffer += lowered.encode('utf-8')
+        self._offsets.append(len(self._buffer))
+        self._entry_ids.append(entry_id)
+        self._is_dir.append(1 if is_dir else 0)
+        self._alive.append(1)
+        self._slot_of[entry_id] = slot
+        self._count += 1
+        for gram in trigrams(lowered):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(slot)
+
+    def remove(self, entry_id):
+        """Tombstone an entry; its slot is skipped by every later query until the next compaction"""
+        slot = self._slot_of.pop(entry_id, None)
+        if slot is None:
+            return
+        self._alive[slot] = 0
+        self._count -= 1
+        dead = len(self._entry_ids) - self._count
+        if dead >= COMPACT_MIN_DEAD and dead > COMPACT_RATIO * len(self._entry_ids):
+            self._compact()
+
+    def _compact(self):
+        """Rebuild every column and posting list from the live slots only"""
+        live = [
+            (self._entry_ids[slot], self._name_bytes(slot).decode('utf-8'), self._is_dir[slot])
+            for slot in range(len(self._entry_ids)) if self._alive[slot]
+        ]
+        self.__init__()
+        for entry_id, name, is_dir in live:
+            self.add(entry_id, name, is_dir)
+
+    def _name_bytes(self, slot):
+        return self._buffer[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def _candidates(self, keyword):
+        grams = trigrams(keyword)
+        if not grams:
+            # Shorter than a trigram: every slot is a candidate
+            return range(len(self._entry_ids))
+
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if len(candidates) <= VERIFY_THRESHOLD:
+                break
+            # Posting lists are append-only in slot order, so they stay sorted
+            filtered = array('I')
+            size = len(posting)
+            for slot in candidates:
+                pos = bisect_left(posting, slot)
+                if pos < size and posting[pos] == slot:
+                    filtered.append(slot)
+            candidates = filtered
+        return candidates
+
+    def query(self, keyword, search_type="both", within=None):
+        """Return entry ids whose name contains keyword (case-insensitive), limited to the set within if given"""
+        needle = keyword.lower().encode('utf-8')
+        want_dir = {"file": 0, "folder": 1}.get(search_type)
+        matches = []
+        for slot in self._candidates(keyword.lower()):
+            if not self._alive[slot]:
+                continue
+            if within is not None and self._entry_ids[slot] not in within:
+                continue
+            if want_dir is not None and self._is_dir[slot] != want_dir:
+                continue
+            if needle in self._name_bytes(slot):
+                matches.append(self._entry_ids[slot])
+        return matches
+
+    def memory_bytes(self):
+        """Size of the buffers, the id lookup and the posting lists, object overhead included"""
+        postings = sys.getsizeof(self._postings) + sum(
+            sys.getsizeof(gram) + sys.getsizeof(posting) for gram, posting in self._postings.items()
+        )
+        slots = sys.getsizeof(self._slot_of) + sum(
+            sys.getsizeof(entry_id) + sys.getsizeof(slot) for entry_id, slot in self._slot_of.items()
+        )
+        return postings + slots + sum(sys.getsizeof(column) for column in (
+            self._buffer, self._offsets, self._entry_ids, self._is_dir, self._alive,
+        ))
@@ -3,9 +3,12 @@ import requests
 import os
 import speech_recognition as sr
 import pyttsx3
+import json
+import uuid
 
 # --- Backend API URL ---
 API_URL = "http://127.0.0.1:8002/file-agent"
+STREAM_URL = f"{API_URL}/stream"
 
 # --- Page Configuration with Nebula Theme ---
 st.set_page_config(
@@ -147,6 +150,9 @@ if "cwd" not in st.session_state:
     st.session_state.cwd = os.getcwd()
 if "queued_command" not in st.session_state:
     st.session_state.queued_command = None
+if "session_id" not in st.session_state:
+    # One backend session (chat + memory) per browser session
+    st.session_state.session_id = uuid.uuid4().hex
 
 # --- Text-to-Speech Engine ---
 def speak_text(text):
@@ -159,19 +165,49 @@ def speak_text(text):
     except Exception as e:
         st.error(f"Text-to-speech error: {e}")
 
+# --- Streaming Helper ---
+def read_sse(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 # --- Chat Function ---
 def send_to_agent(user_input):
     """Send request to backend and update chat history"""
     try:
+        progress = st.empty()
+        result = None
+        match_count = 0
         with st.spinner("🔄 Processing your request..."):
             response = requests.post(
-                API_URL,
-                json={"prompt": user_input, "current_dir": st.session_state.cwd},
+                STREAM_URL,
+                json={"prompt": user_input, "current_dir": st.session_state.cwd, "session_id": st.session_state.session_id},
                 timeout=6000,
+                stream=True,
             )
+            if response.status_code == 200:
+                for event, data in read_sse(response):
+                    if event == "match":
+                        match_count += 1
+                        progress.info(f"🔎 {match_count} found so far, latest: {data['path']}")
+                        if match_count == 1:
+                            # Speak the first hit immediately instead of waiting for the full search
+                            speak_text(f"Found {data['name']}")
+                    elif event == "result":
+                        result = data
+                    elif event == "error":
+                        result = {"result": {"error": data.get("error")}}
+        progress.empty()
 
-        if response.status_code == 200:
-            result = response.json()
+        if response.status_code == 200 and result is not None:
 
             # Extract results
             agent_cmd = result.get("agent_command", {})
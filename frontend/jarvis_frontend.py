@@ -7,6 +7,7 @@ from datetime import datetime
 import speech_recognition as sr
 import pyaudio
 import time
+import uuid
 import pyttsx3
 import webbrowser
 import os
@@ -256,6 +257,8 @@ class VoiceAssistantUI:
         self.root.configure(bg='#2c3e50')
         
         self.base_url = "http://127.0.0.1:8002"
+        # Keeps this window's chat and memory separate from other clients on the backend
+        self.session_id = uuid.uuid4().hex
         self.is_listening = False
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
@@ -873,8 +876,21 @@ Local IP: {local_ip}
             self.log_message(f"❌ Error formatting speech response: {e}")
             return "Command executed. Check the log for details."
     
+    def stream_events(self, response):
+        """Parse a Server-Sent Events response into (event, data) pairs"""
+        event, data_lines = "message", []
+        for line in response.iter_lines(decode_unicode=True):
+            if line == "":
+                if data_lines:
+                    yield event, json.loads("\n".join(data_lines))
+                event, data_lines = "message", []
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].strip())
+
     def send_command_to_backend(self, command):
-        """Send command to backend /file-agent endpoint"""
+        """Send command to backend /file-agent/stream endpoint, speaking the first search hit right away"""
         def send_thread():
             try:
                 self.log_message(f"📤 Sending to backend: '{command}'")
@@ -882,17 +898,36 @@ Local IP: {local_ip}
                 
                 payload = {
                     "prompt": command,
-                    "current_dir": "."
+                    "current_dir": ".",
+                    "session_id": self.session_id
                 }
                 
                 response = requests.post(
-                    f"{self.base_url}/file-agent", 
+                    f"{self.base_url}/file-agent/stream", 
                     json=payload, 
-                    timeout=30
+                    timeout=30,
+                    stream=True
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    result = None
+                    match_count = 0
+                    for event, data in self.stream_events(response):
+                        if event == "match":
+                            match_count += 1
+                            if match_count == 1:
+                                # Time-to-first-result matters most for voice
+                                self.log_message(f"🔎 First match: {data['path']}")
+                                self.status_text.config(text=f"🔎 Found {data['name']}, still searching...")
+                                self.speak_response(f"Found {data['name']}")
+                        elif event == "result":
+                            result = data
+                        elif event == "error":
+                            raise RuntimeError(data.get("error"))
+
+                    if result is None:
+                        raise RuntimeError("Stream ended without a result")
+
                     self.log_message(f"✅ Backend response received")
                     self.update_debug_info("✅ Command executed successfully")
                     self.status_text.config(text="✅ Command executed successfully")
@@ -903,8 +938,11 @@ Local IP: {local_ip}
                     # Open result in separate window only for specific queries (not for app launches)
                     self.handle_backend_response(command, result)
                     
-                    # Speak the response - ALWAYS speak the response
-                    response_text = self.format_response_for_speech(result)
+                    # Speak the response - the first hit was already spoken, so just give the total
+                    if match_count:
+                        response_text = f"Found {match_count} matches in total."
+                    else:
+                        response_text = self.format_response_for_speech(result)
                     self.log_message(f"🔊 Speech content: {response_text}")
                     self.speak_response(response_text)
                         